@@ -21,6 +21,93 @@ class Settings(BaseSettings):
     AI_POPULARITY_WEIGHT: float = 0.3
     AI_SUITABILITY_WEIGHT: float = 0.3
 
+    # Destination ranking: only the local top K go to the LLM
+    RANK_LLM_MAX_K: int = 15
+    RANK_LLM_MIN_K: int = 5
+    RANK_LLM_LATENCY_BUDGET: float = 4.0            # seconds per LLM ranking call
+    RANK_LLM_DEADLINE: float = 5.0                  # seconds before serving the local ranking
+    RANK_CACHE_TTL: int = 60 * 60 * 6               # seconds
+    RANK_CACHE_SIZE: int = 1024
+
+    # Mongo connection pools (per client: sync and async each get one)
+    MONGO_MAX_POOL_SIZE: int = 200
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 60_000
+    MONGO_MAX_CONNECTING: int = 4
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 10_000
+
+    # Geocode cache (in-process LRU in front of the Mongo geocode collection)
+    GEOCODE_CACHE_SIZE: int = 2048
+    GEOCODE_CACHE_TTL: int = 60 * 60 * 24 * 30      # seconds, found cities
+    GEOCODE_NEGATIVE_TTL: int = 60 * 60 * 24        # seconds, unknown cities
+
+    # Offline gazetteer index (defaults to app/data/gazetteer.idx)
+    GAZETTEER_INDEX_PATH: str | None = None
+
+    # Overpass results cached per geohash tile
+    PLACES_TILE_TTL: int = 60 * 60 * 24 * 3         # seconds
+    PLACES_TILE_CACHE_SIZE: int = 4096              # tiles kept in memory
+
+    # ORS route cache (coordinates snapped to a grid of ROUTE_SNAP_DEG)
+    ROUTE_SNAP_DEG: float = 0.01                    # ~1.1 km
+    ROUTE_CACHE_TTL: int = 60 * 60 * 24 * 7         # seconds
+    ROUTE_CACHE_SIZE: int = 2048
+    ORS_MATRIX_MAX_DESTINATIONS: int = 49           # per /v2/matrix request
+
+    # Trip planner stage budgets (seconds)
+    PLAN_DEADLINE: float = 22.0
+    PLAN_ITINERARY_TIMEOUT: float = 20.0
+    PLAN_TRANSPORT_TIMEOUT: float = 15.0
+
+    # Background plan jobs (POST /trips/plan?async=1)
+    PLAN_JOB_WORKERS: int = 4
+    PLAN_JOB_POLL_INTERVAL: float = 0.5             # seconds, SSE progress
+    PLAN_JOB_STREAM_TIMEOUT: float = 120.0          # seconds
+    PLAN_JOB_STALE_AFTER: float = 600.0             # seconds, "planning" older than this is orphaned
+
+    # Upstream HTTP clients (app/core/upstream.py)
+    UPSTREAM_HTTP2: bool = True                     # needs the h2 package
+    UPSTREAM_RETRIES: int = 2                       # connection failures and 429/503 only
+    UPSTREAM_DEADLINE: float = 30.0                 # seconds, all attempts of one request
+    UPSTREAM_BACKOFF_BASE: float = 0.25             # seconds
+    UPSTREAM_BACKOFF_MAX: float = 2.0               # seconds
+    UPSTREAM_KEEPALIVE_EXPIRY: float = 30.0         # seconds
+
+    # Itinerary cache (destination, days, budget bucket) -> LLM variants
+    ITINERARY_CACHE_VARIANTS: int = 3
+    ITINERARY_CACHE_TTL: int = 60 * 60 * 24 * 14    # seconds
+    ITINERARY_CACHE_SIZE: int = 512                 # keys kept in memory
+    ITINERARY_BUDGET_BUCKET_RATIO: float = 1.5
+
+    # Trip explanations (destination x personality), LRU in front of Mongo
+    EXPLANATION_CACHE_SIZE: int = 4096
+    EXPLANATION_CACHE_TTL: int = 60 * 60 * 24 * 7   # seconds
+    EXPLANATION_PRECOMPUTE_CONCURRENCY: int = 4
+    EXPLANATION_PRECOMPUTE_ON_STARTUP: bool = False
+
+    # Hotels (RapidAPI Booking): city -> dest_id, and search results
+    HOTEL_DEST_CACHE_TTL: int = 60 * 60 * 24 * 90   # seconds, found cities
+    HOTEL_DEST_NEGATIVE_TTL: int = 60 * 60 * 24     # seconds, unknown cities
+    HOTEL_DEST_CACHE_SIZE: int = 2048
+    HOTEL_RESULT_TTL: int = 60 * 10                 # seconds, served as fresh
+    HOTEL_RESULT_STALE_TTL: int = 60 * 60           # seconds, served while revalidating
+    HOTEL_RESULT_CACHE_SIZE: int = 1024
+    HOTEL_FLEX_MAX_DAYS: int = 7                    # /hotels/search?flex_days= upper bound
+    HOTEL_FLEX_CONCURRENCY: int = 4                 # parallel searches per flex request
+
+    # OpenWeather forecast series per grid cell (expire at 3-hour boundaries)
+    WEATHER_SNAP_DEG: float = 0.1                   # ~11 km
+    WEATHER_CACHE_SIZE: int = 1024
+    WEATHER_MAX_CONCURRENCY: int = 8                # OpenWeather calls in flight
+    WEATHER_BATCH_MAX: int = 50                     # destinations per POST /weather/batch
+
+    # Trip summary sections (GET /trips/summary/{trip_id})
+    SUMMARY_TRANSPORT_TTL: int = 60 * 60 * 24       # seconds
+    SUMMARY_HOTELS_TTL: int = 60 * 60               # seconds
+    SUMMARY_EMPTY_TTL: int = 60 * 15                # seconds, sections the upstream had nothing for
+
+    # In-memory smart_destinations snapshot (polled when change streams are unavailable)
+    CATALOG_REFRESH_INTERVAL: float = 300.0         # seconds
     
 
     class Config:
@@ -0,0 +1,131 @@
+# app/core/upstream.py
+"""
+Shared async HTTP clients for every external provider.
+
+One pooled keep-alive httpx.AsyncClient per provider (HTTP/2 when the
+optional `h2` package is installed), with its own timeout and connection
+limits. `request` retries only what can't have reached the provider
+(connection failures, 429 / 503) with exponential backoff and full
+jitter, within one overall deadline; `stream` is for long streamed
+responses and is never retried.
+"""
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Tuple
+
+import httpx
+
+from app.config import settings
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+USER_AGENT = "TravelEaseApp/1.0 (contact@email.com)"
+
+# provider -> (timeout seconds, max connections)
+PROVIDERS: Dict[str, Tuple[float, int]] = {
+    "groq": (20.0, 20),
+    "nominatim": (10.0, 4),        # public instance: keep it small
+    "overpass": (30.0, 8),
+    "ors": (20.0, 20),
+    "rapidapi": (20.0, 10),
+    "openweather": (10.0, 10),
+}
+
+# Safe to resend even for POSTs and metered calls: the request was
+# refused or never sent. Read timeouts and 502/504 are not retried, the
+# provider may already have processed (and billed) the request.
+RETRY_STATUSES = {429, 503}
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def get_client(provider: str) -> httpx.AsyncClient:
+    """
+    Pooled client for `provider`, created on first use in the running
+    event loop (a client can't be shared across loops).
+    """
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(provider)
+    if entry and entry[0] is loop and not entry[1].is_closed:
+        return entry[1]
+
+    timeout, max_connections = PROVIDERS[provider]
+    client = httpx.AsyncClient(
+        http2=settings.UPSTREAM_HTTP2 and HTTP2_AVAILABLE,
+        timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY
+        ),
+        headers={"User-Agent": USER_AGENT}
+    )
+    _clients[provider] = (loop, client)
+    return client
+
+
+async def close_clients() -> None:
+    loop = asyncio.get_running_loop()
+    for provider, (client_loop, client) in list(_clients.items()):
+        if client_loop is loop:
+            await client.aclose()
+            _clients.pop(provider, None)
+
+
+def _backoff(attempt: int) -> float:
+    # full jitter: uniform(0, base * 2^attempt), capped
+    cap = settings.UPSTREAM_BACKOFF_BASE * (2 ** attempt)
+    return random.uniform(0, min(cap, settings.UPSTREAM_BACKOFF_MAX))
+
+
+async def request(provider: str, method: str, url: str, retries: int = None, deadline: float = None, **kwargs) -> httpx.Response:
+    """
+    Send a request through the provider's pooled client.
+
+    Connection failures and 429/503 answers are retried up to `retries`
+    times (UPSTREAM_RETRIES by default), all attempts and backoffs within
+    `deadline` seconds (UPSTREAM_DEADLINE by default). The last response is
+    returned as-is (callers check the status), the last exception is
+    re-raised; running out of time raises httpx.TimeoutException.
+    """
+    retries = settings.UPSTREAM_RETRIES if retries is None else retries
+    deadline = settings.UPSTREAM_DEADLINE if deadline is None else deadline
+    client = get_client(provider)
+    loop = asyncio.get_running_loop()
+    give_up = loop.time() + deadline
+
+    for attempt in range(retries + 1):
+        try:
+            response = await asyncio.wait_for(
+                client.request(method, url, **kwargs),
+                timeout=max(0.0, give_up - loop.time())
+            )
+        except asyncio.TimeoutError:
+            raise httpx.TimeoutException(f"{provider}: no answer within {deadline:.0f}s")
+        except RETRY_ERRORS:
+            delay = _backoff(attempt)
+            if attempt >= retries or loop.time() + delay >= give_up:
+                raise
+        else:
+            delay = _backoff(attempt)
+            if (
+                response.status_code not in RETRY_STATUSES
+                or attempt >= retries
+                or loop.time() + delay >= give_up
+            ):
+                return response
+            await response.aclose()
+
+        await asyncio.sleep(delay)
+
+
+@asynccontextmanager
+async def stream(provider: str, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+    async with get_client(provider).stream(method, url, **kwargs) as response:
+        yield response
@@ -0,0 +1,170 @@
+# app/data/import_osm_pois.py
+"""
+Import POIs from a local OSM XML extract (.osm, .osm.gz or .osm.bz2) into
+the `pois` collection, which /discover/nearby queries with $geoNear before
+falling back to Overpass.
+
+Only the tags fetch_nearby_places asks Overpass for are kept:
+node tourism=*, amenity=restaurant|cafe, historic=* and way tourism=*.
+
+Usage:
+    python -m app.data.import_osm_pois extracts/rajasthan.osm.bz2 --name rajasthan
+
+Runs fully offline. Node coordinates are held in memory to place ways at
+their centre, so city/state sized extracts are the intended input.
+"""
+import argparse
+import bz2
+import gzip
+import os
+from array import array
+from datetime import datetime
+from xml.etree.ElementTree import iterparse
+
+from pymongo import UpdateOne, GEOSPHERE
+
+from app.database import pois_collection, poi_regions_collection
+
+BATCH_SIZE = 1000
+POI_AMENITIES = {"restaurant", "cafe"}
+
+
+def _open_extract(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _poi_type(tags: dict, is_way: bool):
+    """
+    Same precedence as fetch_nearby_places: tourism, amenity, historic.
+    Returns None for elements the Overpass query would not return.
+    """
+    if is_way:
+        return tags.get("tourism")
+    if tags.get("tourism"):
+        return tags["tourism"]
+    if tags.get("amenity") in POI_AMENITIES:
+        return tags["amenity"]
+    return tags.get("historic")
+
+
+def _poi_doc(osm_id: str, tags: dict, lat: float, lon: float, poi_type: str, region: str):
+    return {
+        "osm_id": osm_id,
+        "name": tags["name"],
+        "type": poi_type,
+        "tags": {k: tags[k] for k in ("tourism", "amenity", "historic") if k in tags},
+        "location": {"type": "Point", "coordinates": [round(lon, 7), round(lat, 7)]},
+        "region": region,
+        "imported_at": datetime.utcnow()
+    }
+
+
+def ensure_indexes():
+    pois_collection.create_index([("location", GEOSPHERE)])
+    pois_collection.create_index("osm_id", unique=True)
+    poi_regions_collection.create_index("name", unique=True)
+
+
+def import_extract(path: str, region: str) -> int:
+    ensure_indexes()
+
+    # node id -> position in the coordinate arrays (for way centres)
+    node_pos = {}
+    node_lat, node_lon = array("d"), array("d")
+    bounds = None
+    seen_bounds = [90.0, 180.0, -90.0, -180.0]
+
+    ops = []
+    imported = 0
+
+    def flush():
+        nonlocal ops, imported
+        if ops:
+            pois_collection.bulk_write(ops, ordered=False)
+            imported += len(ops)
+            ops = []
+
+    with _open_extract(path) as f:
+        for _, elem in iterparse(f, events=("end",)):
+            tag = elem.tag
+
+            if tag == "bounds":
+                bounds = [
+                    float(elem.get("minlat")), float(elem.get("minlon")),
+                    float(elem.get("maxlat")), float(elem.get("maxlon"))
+                ]
+
+            elif tag == "node":
+                lat, lon = float(elem.get("lat")), float(elem.get("lon"))
+                node_pos[elem.get("id")] = len(node_lat)
+                node_lat.append(lat)
+                node_lon.append(lon)
+
+                seen_bounds[0] = min(seen_bounds[0], lat)
+                seen_bounds[1] = min(seen_bounds[1], lon)
+                seen_bounds[2] = max(seen_bounds[2], lat)
+                seen_bounds[3] = max(seen_bounds[3], lon)
+
+                tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+                poi_type = _poi_type(tags, is_way=False)
+                if tags.get("name") and poi_type:
+                    doc = _poi_doc(f"node/{elem.get('id')}", tags, lat, lon, poi_type, region)
+                    ops.append(UpdateOne({"osm_id": doc["osm_id"]}, {"$set": doc}, upsert=True))
+                elem.clear()
+
+            elif tag == "way":
+                tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+                poi_type = _poi_type(tags, is_way=True)
+                if tags.get("name") and poi_type:
+                    refs = [node_pos[nd.get("ref")] for nd in elem.iter("nd") if nd.get("ref") in node_pos]
+                    if refs:
+                        lat = sum(node_lat[i] for i in refs) / len(refs)
+                        lon = sum(node_lon[i] for i in refs) / len(refs)
+                        doc = _poi_doc(f"way/{elem.get('id')}", tags, lat, lon, poi_type, region)
+                        ops.append(UpdateOne({"osm_id": doc["osm_id"]}, {"$set": doc}, upsert=True))
+                elem.clear()
+
+            elif tag == "relation":
+                elem.clear()
+
+            if len(ops) >= BATCH_SIZE:
+                flush()
+
+    flush()
+
+    south, west, north, east = bounds or seen_bounds
+    poi_regions_collection.update_one(
+        {"name": region},
+        {"$set": {
+            "name": region,
+            "source": os.path.basename(path),
+            "south": south,
+            "west": west,
+            "north": north,
+            "east": east,
+            "poi_count": imported,
+            "imported_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import OSM POIs into MongoDB")
+    parser.add_argument("path", help="OSM XML extract (.osm, .osm.gz, .osm.bz2)")
+    parser.add_argument("--name", help="region name (defaults to the file name)")
+    args = parser.parse_args()
+
+    region = args.name or os.path.basename(args.path).split(".")[0]
+    count = import_extract(args.path, region)
+    print(f"✅ Imported {count} POIs for region '{region}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# app/data/precompute_explanations.py
+"""
+Fill the trip_explanations collection for every smart destination x
+personality type, so /smart-destination/explain never waits on the LLM.
+
+Usage:
+    python -m app.data.precompute_explanations --concurrency 4
+
+Safe to interrupt and re-run: pairs already stored are skipped.
+"""
+import argparse
+import asyncio
+
+from app.services.trip_explainer_service import precompute_explanations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute trip explanations")
+    parser.add_argument("--concurrency", type=int, help="parallel LLM calls")
+    parser.add_argument("--limit", type=int, help="generate at most this many pairs")
+    args = parser.parse_args()
+
+    stats = asyncio.run(precompute_explanations(args.concurrency, args.limit))
+    print(
+        f"✅ Explanations: {stats['generated']} generated, {stats['existing']} already cached, "
+        f"{stats['failed']} failed ({stats['total']} pairs)"
+    )
+
+
+if __name__ == "__main__":
+    main()
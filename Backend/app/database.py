@@ -1,7 +1,14 @@
 from pymongo import MongoClient
 from app.config import settings
 
-client = MongoClient(settings.MONGO_URI)
+client = MongoClient(
+    settings.MONGO_URI,
+    maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+    minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+    maxConnecting=settings.MONGO_MAX_CONNECTING,
+    waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+)
 db = client.travelease
 
 users_collection = db.users
@@ -10,4 +17,12 @@ wallets_collection = db["wallets"]
 transactions_collection = db["transactions"]
 explore_places_collection = db["explore_places"]
 smart_destinations_collection = db["smart_destinations"]
-trip_explanations_collection = db["trip_explanations"]
\ No newline at end of file
+trip_explanations_collection = db["trip_explanations"]
+geocode_cache_collection = db["geocode_cache"]
+place_tiles_collection = db["place_tiles"]
+pois_collection = db["pois"]
+poi_regions_collection = db["poi_regions"]
+route_cache_collection = db["route_cache"]
+itinerary_cache_collection = db["itinerary_cache"]
+hotel_dest_cache_collection = db["hotel_dest_cache"]
+weather_cache_collection = db["weather_cache"]
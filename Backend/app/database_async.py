@@ -0,0 +1,25 @@
+# app/database_async.py
+from pymongo import AsyncMongoClient
+from app.config import settings
+
+# Same database and collections as app/database.py, on PyMongo's native
+# asyncio driver, for `async def` routes. Connections are opened lazily
+# on the running event loop.
+client = AsyncMongoClient(
+    settings.MONGO_URI,
+    maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+    minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+    maxConnecting=settings.MONGO_MAX_CONNECTING,
+    waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    connect=False
+)
+db = client.travelease
+
+users_collection = db.users
+trips_collection = db.trips
+wallets_collection = db["wallets"]
+transactions_collection = db["transactions"]
+explore_places_collection = db["explore_places"]
+smart_destinations_collection = db["smart_destinations"]
+trip_explanations_collection = db["trip_explanations"]
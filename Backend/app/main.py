@@ -10,9 +10,15 @@ from app.routes.hotels import router as hotels_router
 from app.routes import weather
 from app.routes import explore
 from app.routes.smart_destination import router as smart_destination_router
+from app.services import gazetteer
+from app.services import plan_jobs
+from app.services import destination_catalog
+from app.services.trip_explainer_service import precompute_explanations
+from app.config import settings
+from app.core import upstream
 
-
-import requests
+import asyncio
+import httpx
 
 app = FastAPI()
 
@@ -43,26 +49,76 @@ app.include_router(discover_router)
 app.include_router(trip_places.router)
 app.include_router(transport_router)
 app.include_router(hotels_router)
+app.include_router(weather.router)
 app.include_router(explore.router)
 app.include_router(smart_destination_router)
 
 
 
+@app.on_event("startup")
+async def sweep_interrupted_plan_jobs():
+    # trips a previous process left in "planning" would never finish
+    plan_jobs.start_job_sweeper()
+
+
+@app.on_event("startup")
+async def load_destination_catalog():
+    await destination_catalog.start_catalog()
+
+
+_background_tasks = set()
+
+
+@app.on_event("startup")
+async def start_explanation_precompute():
+    # fills missing destination x personality explanations in the background
+    if settings.EXPLANATION_PRECOMPUTE_ON_STARTUP:
+        task = asyncio.create_task(precompute_explanations())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+@app.on_event("shutdown")
+async def close_upstream_clients():
+    await upstream.close_clients()
+
+
+@app.on_event("shutdown")
+async def stop_destination_catalog():
+    await destination_catalog.stop_catalog()
+
+
 # Root route
 @app.get("/")
 def root():
     return {"message": "Backend is running"}
 
 @app.get("/search")
-def search_place(q: str = Query(...)):
+async def search_place(q: str = Query(...)):
+    # Typeahead is served from the offline gazetteer; Nominatim is only
+    # asked when nothing local matches.
+    matches = gazetteer.suggest(q, limit=5)
+    if matches:
+        return [
+            {
+                "name": m["name"],
+                "display_name": ", ".join(p for p in (m["name"], m["region"], m["country"]) if p),
+                "lat": str(m["lat"]),
+                "lon": str(m["lon"]),
+                "type": m["kind"],
+                "source": "gazetteer"
+            }
+            for m in matches
+        ]
+
     url = "https://nominatim.openstreetmap.org/search"
     params = {
         "q": q,
         "format": "json",
         "limit": 5
     }
-    headers = {
-        "User-Agent": "TravelEaseApp/1.0 (contact@email.com)"
-    }
-    r = requests.get(url, params=params, headers=headers)
-    return r.json()
\ No newline at end of file
+    try:
+        r = await upstream.request("nominatim", "GET", url, params=params)
+        return r.json()
+    except (httpx.HTTPError, ValueError):
+        return []
\ No newline at end of file
@@ -0,0 +1,13 @@
+from typing import List, Optional, Union
+from pydantic import BaseModel
+
+class WeatherDestination(BaseModel):
+    name: str
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+class WeatherBatchInput(BaseModel):
+    # city names, or {name, lat, lon} when the caller already has coordinates
+    destinations: List[Union[str, WeatherDestination]]
+    start_date: str  # YYYY-MM-DD
+    end_date: str    # YYYY-MM-DD
@@ -1,26 +1,40 @@
+import json
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
 from app.core.security import get_current_user
-from app.database import trips_collection
-from app.services.places import fetch_nearby_places
+from app.database_async import trips_collection
+from app.services.places import fetch_nearby_places, stream_nearby_places
 
 router = APIRouter(prefix="/discover", tags=["Discover"])
 
 
 @router.get("/nearby")
-def discover_nearby(
+async def discover_nearby(
     trip_id: str | None = None,     # optional now
     radius: int = 5,
     category: str | None = None,
     lat: float | None = None,        # NEW
     lon: float | None = None,        # NEW
+    limit: int | None = None,
+    cursor: str | None = None,       # opaque, from a previous next_cursor
+    stream: bool = False,            # NDJSON, one place per line
     current_user: str = Depends(get_current_user),
 ):
     """
     Discover nearby places.
     - Uses lat/lon if provided (Search this area)
     - Otherwise falls back to trip coordinates
+    - With `limit`, results are paged; pass back `next_cursor` as `cursor`
+    - With `stream=true`, places are sent as NDJSON as soon as they are
+      decoded (unsorted, no paging; `limit` still caps the total)
     """
+    offset = 0
+    if cursor:
+        if not cursor.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        offset = int(cursor)
 
     # ===============================
     # 1️⃣ Determine search coordinates
@@ -37,7 +51,7 @@ def discover_nearby(
                 detail="trip_id required unless lat/lon provided"
             )
 
-        trip = trips_collection.find_one({
+        trip = await trips_collection.find_one({
             "_id": ObjectId(trip_id),
             "user": current_user
         })
@@ -55,21 +69,43 @@ def discover_nearby(
             )
 
     # ===============================
-    # 2️⃣ Fetch nearby places
+    # 2️⃣ Category filter (multi-select)
     # ===============================
-    places = fetch_nearby_places(search_lat, search_lon, radius)
+    selected = None
+    if category:
+        selected = [c.strip().lower() for c in category.split(",") if c.strip()]
+
+    if stream:
+        lines = (
+            json.dumps(p) + "\n"
+            async for p in stream_nearby_places(
+                search_lat,
+                search_lon,
+                radius,
+                categories=selected,
+                limit=limit
+            )
+        )
+        return StreamingResponse(lines, media_type="application/x-ndjson")
 
     # ===============================
-    # 3️⃣ Category filter (multi-select)
+    # 3️⃣ Fetch nearby places (local POI store → Overpass),
+    #    filtered and paged upstream
     # ===============================
-    if category:
-        selected = [c.strip().lower() for c in category.split(",")]
-        places = [
-            p for p in places
-            if p.get("type") and any(
-                c in p["type"].lower() for c in selected
-            )
-        ]
+    # one extra row tells us whether another page exists
+    places = await fetch_nearby_places(
+        search_lat,
+        search_lon,
+        radius,
+        categories=selected,
+        limit=(limit + 1) if limit else None,
+        offset=offset
+    )
+
+    next_cursor = None
+    if limit and len(places) > limit:
+        places = places[:limit]
+        next_cursor = str(offset + limit)
 
     # ===============================
     # 4️⃣ Response
@@ -81,5 +117,6 @@ def discover_nearby(
             "lon": search_lon
         },
         "count": len(places),
-        "places": places
+        "places": places,
+        "next_cursor": next_cursor
     }
@@ -3,12 +3,12 @@ from datetime import datetime
 from bson import ObjectId
 
 from app.core.security import get_current_user
-from app.database import explore_places_collection
+from app.database_async import explore_places_collection
 
 router = APIRouter(prefix="/explore", tags=["Explore"])
 
 @router.post("/save")
-def save_explore_place(
+async def save_explore_place(
     data: dict,
     current_user: str = Depends(get_current_user)
 ):
@@ -22,7 +22,7 @@ def save_explore_place(
     }
 
     # prevent duplicate saves
-    exists = explore_places_collection.find_one({
+    exists = await explore_places_collection.find_one({
         "user": current_user,
         "name": place["name"]
     })
@@ -30,14 +30,14 @@ def save_explore_place(
     if exists:
         return {"message": "Already saved"}
 
-    explore_places_collection.insert_one(place)
+    await explore_places_collection.insert_one(place)
 
     return {"message": "Place saved"}
 
 
 
 @router.get("/saved")
-def get_saved_places(
+async def get_saved_places(
     current_user: str = Depends(get_current_user)
 ):
     places = explore_places_collection.find({
@@ -46,7 +46,7 @@ def get_saved_places(
 
     result = []
 
-    for p in places:
+    async for p in places:
         result.append({
             "id": str(p["_id"]),
             "name": p["name"],
@@ -60,11 +60,11 @@ def get_saved_places(
 
 
 @router.delete("/saved")
-def delete_saved_place(
+async def delete_saved_place(
     name: str,
     current_user: str = Depends(get_current_user)
 ):
-    explore_places_collection.delete_one({
+    await explore_places_collection.delete_one({
         "user": current_user,
         "name": name
     })
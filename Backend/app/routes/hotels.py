@@ -1,18 +1,38 @@
 # app/routes/hotels.py
 from fastapi import APIRouter, Query, HTTPException
-from app.services.hotels import search_hotels
+from app.config import settings
+from app.services.hotels import search_hotels, search_hotels_flexible
 
 router = APIRouter(prefix="/hotels", tags=["Hotels"])
 
 @router.get("/search")
-def search(
+async def search(
     city: str = Query(...),
     checkin: str = Query(...),
     checkout: str = Query(...),
     guests: int = Query(1),
+    flex_days: int = Query(0, ge=0, le=settings.HOTEL_FLEX_MAX_DAYS),
 ):
+    # flex_days > 0: also search check-ins up to flex_days earlier / later
+    if flex_days:
+        try:
+            result = await search_hotels_flexible(city, checkin, checkout, guests, flex_days)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="checkin/checkout must be YYYY-MM-DD")
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=str(e))
+
+        return {
+            "status": "ok",
+            "city": city,
+            "flex_days": flex_days,
+            "hotels": result["hotels"],
+            "grid": result["grid"],
+            "cheapest": result["cheapest"]
+        }
+
     try:
-        hotels = search_hotels(city, checkin, checkout, guests)
+        hotels = await search_hotels(city, checkin, checkout, guests)
         return {
             "status": "ok",
             "city": city,
@@ -1,22 +1,22 @@
 from fastapi import APIRouter
 from datetime import datetime
-from app.database import smart_destinations_collection
-import random
 import json
 from app.services.groq_ai import generate_recommendations
-from app.services.ai_ranking_service import rank_destinations
+from app.services.ai_ranking_service import rank_destinations, NEUTRAL_AI_SCORE
 from app.services.personality_engine import detect_personality
 from app.services.trip_explainer_service import generate_trip_explanation
 from app.services.refinement_engine import interpret_refinement
-from app.services.scoring_engine import compute_final_score
+from app.services.scoring_engine import score_batch
+from app.services.geocode import geocode_city
+from app.services import gazetteer
+from app.services import destination_catalog
+from app.services.transport import get_transport_options_many
 
 router = APIRouter(
     prefix="/smart-destination",
     tags=["Smart Destination"]
 )
 
-collection = smart_destinations_collection
-
 def get_season_from_month(month: int):
     if month in [12, 1, 2]:
         return "winter"
@@ -29,7 +29,7 @@ def get_season_from_month(month: int):
     
 
 @router.post("/find")
-def find_destinations(data: dict):
+async def find_destinations(data: dict):
 
     # ---------- LAYER 1 ----------
     selected_tags = data.get("trip_tags", [])
@@ -38,38 +38,9 @@ def find_destinations(data: dict):
 
     season = get_season_from_month(datetime.utcnow().month)
 
-    query = {}
-
-    if selected_tags:
-        query["trip_tags"] = {"$all": selected_tags}
-
-    if companion:
-        query["companion_tags"] = {"$in": [companion]}
-
-    if budget:
-        query["budget_levels"] = {"$in": [budget]}
-
-    if season:
-        query["best_seasons"] = {"$in": [season]}
-
-    print("TOTAL:", collection.count_documents({}))
-    print("QUERY BEFORE FIND:", query)
-
-    results = list(collection.find(query))
-    print("RESULT COUNT BEFORE RELAX:", len(results))
-
-    # Relax only if STRICT season filter fails
-    if len(results) < 3:
-        query.pop("best_seasons", None)
-        results = list(collection.find(query))
-
-    random.shuffle(results)
-
-    results = sorted(
-        results,
-        key=lambda x: x.get("popularity_score", 0),
-        reverse=True
-    )
+    catalog = await destination_catalog.get_snapshot()
+    results, relaxed = catalog.match(selected_tags, companion, budget, season)
+    print("MATCH COUNT:", len(results), "(season relaxed)" if relaxed else "")
 
     final = []
 
@@ -92,7 +63,7 @@ def find_destinations(data: dict):
 
 
 @router.post("/find-ai")
-def find_destinations_ai(data: dict):
+async def find_destinations_ai(data: dict):
 
     # ---------- LAYER 1 ----------
     selected_tags = data.get("trip_tags", [])
@@ -106,32 +77,15 @@ def find_destinations_ai(data: dict):
     else:
         season = get_season_from_month(datetime.utcnow().month)
 
-    query = {}
-    if selected_tags:
-        query["trip_tags"] = {"$all": selected_tags}
-
-    # direct match (Mongo matches array elements)
-    if companion:
-        query["companion_tags"] = companion
-
-    if budget:
-        query["budget_levels"] = budget
-
-    if season:
-        query["best_seasons"] = {"$in": [season]}
-
-    results = list(collection.find(query))
-
-    # Relax season if not enough variety
-    if len(results) < 3:
-        query.pop("best_seasons", None)
-        results = list(collection.find(query))
+    # Season is relaxed when fewer than 3 destinations match it
+    catalog = await destination_catalog.get_snapshot()
+    results, relaxed = catalog.match(selected_tags, companion, budget, season)
 
     if len(results) == 0:
         return {"season": season, "count": 0, "destinations": []}
 
     # Call AI Ranking Service
-    ranked = rank_destinations(
+    ranked = await rank_destinations(
         selected_tags=selected_tags,
         companion=companion,
         budget=budget,
@@ -139,24 +93,62 @@ def find_destinations_ai(data: dict):
         db_results=results
     )
 
-    print("CURRENT SEASON:", season)
-    print("FINAL QUERY:", query)
-    print("MATCH COUNT:", collection.count_documents(query))
+    print("CURRENT SEASON:", season, "(relaxed)" if relaxed else "")
+    print("MATCH COUNT:", len(results))
 
 
 
     personality_profile = detect_personality(selected_tags, budget, companion)
 
+    # Optional "how far / how much from my city" per destination
+    origin = data.get("origin")
+    if origin and ranked:
+        await attach_transport(origin, ranked, budget)
+
     return {
         "season": season,
         "personality": personality_profile,
         "count": len(ranked),
+        "ai_pending": any(d.get("ai_pending") for d in ranked),
         "destinations": ranked
     }
 
 
+async def attach_transport(origin: str, destinations: list, budget=None):
+    """
+    Add a "transport" block to every destination the offline gazetteer can
+    place, using one ORS matrix request for the whole list.
+    """
+    origin_coords = await geocode_city(origin)
+    if not origin_coords:
+        return
+
+    located = []
+    for d in destinations:
+        place = gazetteer.lookup(f"{d['name']}, {d.get('region') or d.get('country') or ''}")
+        if place:
+            located.append((d, (place["lat"], place["lon"])))
+
+    if not located:
+        return
+
+    try:
+        options = await get_transport_options_many(
+            origin_coords["lat"],
+            origin_coords["lon"],
+            [coords for _, coords in located],
+            budget=budget
+        )
+    except Exception as e:
+        print("Transport matrix error:", e)
+        return
+
+    for (d, _), transport in zip(located, options):
+        d["transport"] = transport
+
+
 @router.post("/explain")
-def explain_destination(data: dict):
+async def explain_destination(data: dict):
 
     destination = data.get("destination")
     personality = data.get("personality")
@@ -164,7 +156,7 @@ def explain_destination(data: dict):
     if not destination or not personality:
         return {"error": "destination and personality required"}
 
-    result = generate_trip_explanation(destination, personality)
+    result = await generate_trip_explanation(destination, personality)
 
     return {
         "destination": destination,
@@ -175,7 +167,7 @@ def explain_destination(data: dict):
 
 
 @router.post("/refine")
-def refine_destinations(data: dict):
+async def refine_destinations(data: dict):
 
     results = data.get("previous_results")
     instruction = data.get("instruction")
@@ -183,27 +175,26 @@ def refine_destinations(data: dict):
     if not results or not instruction:
         return {"error": "previous_results and instruction required"}
 
-    adjustments = interpret_refinement(instruction)
+    adjustments = await interpret_refinement(instruction)
 
     if not adjustments:
         return {"error": "AI refinement failed"}
 
-    refined = []
-
-    for r in results:
-        new_score = compute_final_score(
-            tag_score=r.get("tag_score", 0),
-            popularity_score=r.get("popularity_score", 0),
-            ai_score=r.get("ai_score", 0),
-            weights=adjustments,
-            crowd_factor = r.get("popularity_score", 5)
-        )
+    final_scores, order = score_batch(
+        tag_scores=[r.get("tag_score", 0) for r in results],
+        popularity_scores=[r.get("popularity_score", 0) for r in results],
+        # destinations ranked locally carry ai_score None
+        ai_scores=[NEUTRAL_AI_SCORE if r.get("ai_score", 0) is None else r.get("ai_score", 0) for r in results],
+        weights=adjustments,
+        crowd_factors=[r.get("popularity_score", 5) for r in results]
+    )
 
-        r["final_score"] = new_score
+    refined = []
+    for i in order:
+        r = results[i]
+        r["final_score"] = float(final_scores[i])
         refined.append(r)
 
-    refined = sorted(refined, key=lambda x: x["final_score"], reverse=True)
-
     return {
         "instruction": instruction,
         "applied_adjustments": adjustments,
@@ -212,9 +203,11 @@ def refine_destinations(data: dict):
 
 
 @router.get("/test-smart")
-def test_smart_destinations():
-    data = list(collection.find({}, {"_id": 0}))
+async def test_smart_destinations():
+    catalog = await destination_catalog.get_snapshot()
+    data = [{k: v for k, v in d.items() if k != "_id"} for d in catalog.docs]
     return {
+        "version": catalog.version,
         "count": len(data),
         "data": data
     }
\ No newline at end of file
@@ -1,21 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from datetime import datetime
 from bson import ObjectId
 from fastapi import Query
+import asyncio
 import json
+import time
 
-from app.services.groq_ai import generate_itinerary ,generate_recommendations
+from app.services.groq_ai import generate_itinerary ,generate_recommendations, stream_itinerary
 from app.utils.fallback_itinerary import fallback_itinerary
 from app.services.geocode import geocode_city
 from app.models.trip import TripInput
-from app.database import (
+from app.database_async import (
     trips_collection,
     wallets_collection,
     transactions_collection
 )
 from app.core.security import get_current_user
 from app.services.planner import smart_trip_planner
-from app.services.trip_summary import generate_trip_summary
+from app.services.plan_jobs import submit_plan_job, serialize_job
+from app.config import settings
+from app.services.trip_summary import get_trip_summary
 
 router = APIRouter(prefix="/trips", tags=["Trips"])
 
@@ -48,7 +53,7 @@ def serialize_trip(trip):
 # Root check
 # -------------------------------------------------
 @router.get("/")
-def trips_root():
+async def trips_root():
     return {"message": "Trips API working"}
 
 
@@ -56,11 +61,60 @@ def trips_root():
 # 1️⃣ PLAN TRIP (AI + GEO)
 # -------------------------------------------------
 @router.post("/plan")
-def plan_trip(
+async def plan_trip(
     trip: TripInput,
+    run_async: bool = Query(False, alias="async"),
     current_user: str = Depends(get_current_user)
 ):
-    plan = smart_trip_planner(
+    trip_data = {
+        "user": current_user,
+        "source": trip.source,
+        "destination": trip.destination,
+        "budget": trip.budget,
+        "days": trip.days,
+        "people": trip.people,
+        "created_at": datetime.utcnow(),
+        "confirmed_at": None,
+        "booked_at": None,
+        "saved_food": [],
+        "saved_places": []
+    }
+
+    # Job mode: return immediately, plan in the background
+    if run_async:
+        trip_data.update({
+            "plan": None,
+            "lat": None,
+            "lon": None,
+            "coordinates": None,
+            "status": "planning",
+            "plan_events": []
+        })
+        result = await trips_collection.insert_one(trip_data)
+
+        submit_plan_job(
+            result.inserted_id,
+            trip.source,
+            trip.destination,
+            trip.budget,
+            trip.days,
+            trip.people
+        )
+
+        job_id = str(result.inserted_id)
+        return JSONResponse(
+            status_code=202,
+            content={
+                "id": job_id,
+                "job_id": job_id,
+                "status": "planning",
+                "destination": trip.destination,
+                "poll_url": f"/trips/plan/jobs/{job_id}",
+                "events_url": f"/trips/plan/jobs/{job_id}/events"
+            }
+        )
+
+    plan = await smart_trip_planner(
         trip.source,
         trip.destination,
         trip.budget,
@@ -68,33 +122,22 @@ def plan_trip(
         trip.people
     )
 
-    coords = geocode_city(trip.destination)
+    coords = await geocode_city(trip.destination)
     if not coords:
         raise HTTPException(
             status_code=400,
             detail="Unable to locate destination city"
         )
 
-    trip_data = {
-        "user": current_user,
-        "source": trip.source,
-        "destination": trip.destination,
-        "budget": trip.budget,
-        "days": trip.days,
-        "people": trip.people,
+    trip_data.update({
         "plan": plan,
         "lat": coords["lat"],
         "lon": coords["lon"],
         "coordinates": coords,
-        "status": "planned",
-        "created_at": datetime.utcnow(),
-        "confirmed_at": None,
-        "booked_at": None,
-        "saved_food": [],
-        "saved_places": []
-    }
+        "status": "planned"
+    })
 
-    result = trips_collection.insert_one(trip_data)
+    result = await trips_collection.insert_one(trip_data)
 
     return {
         "id": str(result.inserted_id),
@@ -105,16 +148,79 @@ def plan_trip(
     }
 
 
+async def _get_plan_job(job_id: str, current_user: str):
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=404, detail="Plan job not found")
+
+    trip = await trips_collection.find_one({
+        "_id": ObjectId(job_id),
+        "user": current_user
+    })
+
+    if not trip or "plan_events" not in trip:
+        raise HTTPException(status_code=404, detail="Plan job not found")
+
+    return trip
+
+
+@router.get("/plan/jobs/{job_id}")
+async def plan_job_status(
+    job_id: str,
+    current_user: str = Depends(get_current_user)
+):
+    return serialize_job(await _get_plan_job(job_id, current_user))
+
+
+@router.get("/plan/jobs/{job_id}/events")
+async def plan_job_events(
+    job_id: str,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Server-sent events: one "stage" event per settled planner stage
+    (transport, itinerary), then a final "done" event with the job.
+    """
+    await _get_plan_job(job_id, current_user)
+
+    async def events():
+        sent = 0
+        started = time.monotonic()
+
+        while True:
+            trip = await _get_plan_job(job_id, current_user)
+            job = serialize_job(trip)
+
+            for event in job["events"][sent:]:
+                yield f"event: stage\ndata: {json.dumps(event)}\n\n"
+            sent = len(job["events"])
+
+            if job["status"] != "planning":
+                yield f"event: done\ndata: {json.dumps(job, default=str)}\n\n"
+                return
+
+            if time.monotonic() - started > settings.PLAN_JOB_STREAM_TIMEOUT:
+                yield f"event: timeout\ndata: {json.dumps({'job_id': job_id, 'status': job['status']})}\n\n"
+                return
+
+            await asyncio.sleep(settings.PLAN_JOB_POLL_INTERVAL)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
 # -------------------------------------------------
 # 2️⃣ CONFIRM TRIP (with transport selection)
 # -------------------------------------------------
 @router.post("/confirm/{trip_id}")
-def confirm_trip(
+async def confirm_trip(
     trip_id: str,
     data: dict,
     current_user: str = Depends(get_current_user)
 ):
-    trip = trips_collection.find_one({
+    trip = await trips_collection.find_one({
         "_id": ObjectId(trip_id),
         "user": current_user
     })
@@ -150,7 +256,7 @@ def confirm_trip(
         (per_day_cost * days)
     ) * people
 
-    trips_collection.update_one(
+    await trips_collection.update_one(
         {"_id": ObjectId(trip_id)},
         {"$set": {
             "status": "confirmed",
@@ -172,11 +278,11 @@ def confirm_trip(
 # 3️⃣ BOOK TRIP (Wallet)
 # -------------------------------------------------
 @router.post("/book/{trip_id}")
-def book_trip(
+async def book_trip(
     trip_id: str,
     current_user: str = Depends(get_current_user)
 ):
-    trip = trips_collection.find_one({
+    trip = await trips_collection.find_one({
         "_id": ObjectId(trip_id),
         "user": current_user
     })
@@ -194,16 +300,16 @@ def book_trip(
     
 
 
-    wallet = wallets_collection.find_one({"user": current_user})
+    wallet = await wallets_collection.find_one({"user": current_user})
     if not wallet or wallet["balance"] < cost:
         raise HTTPException(status_code=400, detail="Insufficient wallet balance")
 
-    wallets_collection.update_one(
+    await wallets_collection.update_one(
         {"user": current_user},
         {"$inc": {"balance": -cost}}
     )
 
-    transactions_collection.insert_one({
+    await transactions_collection.insert_one({
         "user": current_user,
         "type": "debit",
         "amount": cost,
@@ -211,7 +317,7 @@ def book_trip(
         "created_at": datetime.utcnow()
     })
 
-    trips_collection.update_one(
+    await trips_collection.update_one(
         {"_id": ObjectId(trip_id)},
         {"$set": {
             "status": "booked",
@@ -219,7 +325,7 @@ def book_trip(
         }}
     )
 
-    wallet = wallets_collection.find_one({"user": current_user})
+    wallet = await wallets_collection.find_one({"user": current_user})
 
     return {
         "message": "Trip booked successfully",
@@ -232,28 +338,28 @@ def book_trip(
 # 4️⃣ USER TRIPS
 # -------------------------------------------------
 @router.get("/my-trips")
-def my_trips(current_user: str = Depends(get_current_user)):
+async def my_trips(current_user: str = Depends(get_current_user)):
     trips = trips_collection.find({"user": current_user})
-    return [serialize_trip(t) for t in trips]
+    return [serialize_trip(t) async for t in trips]
 
 
 # -------------------------------------------------
 # 5️⃣ BOOKED TRIPS
 # -------------------------------------------------
 @router.get("/booked")
-def booked_trips(current_user: str = Depends(get_current_user)):
+async def booked_trips(current_user: str = Depends(get_current_user)):
     trips = trips_collection.find({
         "user": current_user,
         "status": "booked"
     })
-    return [serialize_trip(t) for t in trips]
+    return [serialize_trip(t) async for t in trips]
 
 
 # -------------------------------------------------
 # 6️⃣ AI-ONLY TRIP PLANNING (Groq + Fallback)
 # -------------------------------------------------
 @router.post("/ai/plan-trip")
-def ai_plan_trip(data: dict):
+async def ai_plan_trip(data: dict):
     destination = data.get("destination")
     days = data.get("days")
     budget = data.get("budget")
@@ -264,7 +370,7 @@ def ai_plan_trip(data: dict):
             detail="Missing trip parameters"
         )
 
-    ai_result = generate_itinerary(destination, days, budget)
+    ai_result = await generate_itinerary(destination, days, budget)
 
     if not ai_result:
         ai_result = fallback_itinerary(destination, days, budget)
@@ -276,15 +382,65 @@ def ai_plan_trip(data: dict):
         "itinerary": ai_result
     }
 
+@router.post("/ai/plan-trip/stream")
+async def ai_plan_trip_stream(data: dict):
+    """
+    Server-sent events version of /ai/plan-trip: one "day" event per
+    itinerary day as soon as it is generated, then "done". Days the model
+    did not deliver are filled from fallback_itinerary.
+    """
+    destination = data.get("destination")
+    days = data.get("days")
+    budget = data.get("budget")
+
+    if not destination or not days or not budget:
+        raise HTTPException(
+            status_code=400,
+            detail="Missing trip parameters"
+        )
+
+    try:
+        days = int(days)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid days")
+
+    async def events():
+        sent = 0
+        generated_by = "fallback"
+
+        async for source, day in stream_itinerary(destination, days, budget):
+            generated_by = source
+            sent += 1
+            yield f"event: day\ndata: {json.dumps(day)}\n\n"
+
+        if sent < days:
+            for day in fallback_itinerary(destination, days, budget)["itinerary"][sent:]:
+                yield f"event: day\ndata: {json.dumps(day)}\n\n"
+
+        done = {
+            "destination": destination,
+            "days": days,
+            "budget": budget,
+            "generated_by": generated_by,
+            "fallback_days": max(0, days - sent)
+        }
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 # -------------------------------------------------
 # 7️⃣ TRIP SUMMARY (Phase 6B)  — return trip + summary
 # -------------------------------------------------
 @router.get("/summary/{trip_id}")
-def trip_summary(
+async def trip_summary(
     trip_id: str,
     current_user: str = Depends(get_current_user)
 ):
-    trip = trips_collection.find_one({
+    trip = await trips_collection.find_one({
         "_id": ObjectId(trip_id),
         "user": current_user
     })
@@ -292,15 +448,17 @@ def trip_summary(
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
 
-    summary = generate_trip_summary(trip)
+    # Stored summary is reused while its version matches the trip;
+    # stale hotel / transport sections refresh in the background
+    summary, update = await get_trip_summary(trip)
 
-    trips_collection.update_one(
-        {"_id": ObjectId(trip_id)},
-        {"$set": {
-            "summary": summary,
-            "summary_created_at": datetime.utcnow()
-        }}
-    )
+    if update:
+        # field by field: a background refresh may be writing another section
+        update["summary_created_at"] = datetime.utcnow()
+        await trips_collection.update_one(
+            {"_id": ObjectId(trip_id)},
+            {"$set": update}
+        )
 
     # Build a trip object that matches serialize_trip (and attach summary)
     trip_obj = serialize_trip(trip)
@@ -322,12 +480,12 @@ def trip_summary(
 
 
 @router.post("/{trip_id}/recommendations")
-def trip_recommendations(
+async def trip_recommendations(
     trip_id: str,
     companions: str = Query("family", description="family|friends|couples|solo"),
     current_user: str = Depends(get_current_user)
 ):
-    trip = trips_collection.find_one({
+    trip = await trips_collection.find_one({
         "_id": ObjectId(trip_id),
         "user": current_user
     })
@@ -335,11 +493,15 @@ def trip_recommendations(
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
 
-    saved_places = list(
-        trips_collection.database.places.find({
-            "trip_id": trip_id
-        })
-    )
+    # async plan jobs store the trip before its plan exists
+    if trip.get("status") == "failed":
+        raise HTTPException(status_code=409, detail="Trip plan generation failed")
+    if trip.get("status") == "planning" or not trip.get("plan"):
+        raise HTTPException(status_code=409, detail="Trip plan is still being generated")
+
+    saved_places = await trips_collection.database.places.find({
+        "trip_id": trip_id
+    }).to_list()
 
     companion_context = {
         "family": "Focus on safe, kid-friendly, relaxed attractions.",
@@ -369,7 +531,7 @@ Days: {trip.get("days")}
 People: {trip.get("people")}
 Selected Transport: {trip.get("selected_transport")}
 Saved Places Count: {len(saved_places)}
-Itinerary: {trip.get("plan", {}).get("itinerary")}
+Itinerary: {(trip.get("plan") or {}).get("itinerary")}
 
 Strict Rules:
 - Use real numeric values from Trip Data.
@@ -443,7 +605,7 @@ No explanations.
 Only JSON.
 """
 
-    ai_text = generate_recommendations(prompt)
+    ai_text = await generate_recommendations(prompt)
 
     try:
         parsed = json.loads(ai_text)
@@ -472,12 +634,12 @@ Only JSON.
 # ADD FOOD TO TRIP
 # -------------------------------------------------
 @router.post("/{trip_id}/food/add")
-def add_food_to_trip(
+async def add_food_to_trip(
     trip_id: str,
     data: dict,
     current_user: str = Depends(get_current_user)
 ):
-    trip = trips_collection.find_one({
+    trip = await trips_collection.find_one({
         "_id": ObjectId(trip_id),
         "user": current_user
     })
@@ -490,7 +652,7 @@ def add_food_to_trip(
     if not food:
         raise HTTPException(status_code=400, detail="Food data required")
 
-    trips_collection.update_one(
+    await trips_collection.update_one(
         {"_id": ObjectId(trip_id)},
         {"$push": {"saved_food": food}}
     )
@@ -507,12 +669,12 @@ def add_food_to_trip(
 # 8️⃣ ADD PLACE TO ITINERARY (Correct Version)
 # -------------------------------------------------
 @router.post("/{trip_id}/itinerary/add-place")
-def add_place_to_itinerary(
+async def add_place_to_itinerary(
     trip_id: str,
     data: dict,
     current_user: str = Depends(get_current_user)
 ):
-    trip = trips_collection.find_one({
+    trip = await trips_collection.find_one({
         "_id": ObjectId(trip_id),
         "user": current_user
     })
@@ -526,6 +688,9 @@ def add_place_to_itinerary(
     if not day_number or not place:
         raise HTTPException(status_code=400, detail="Day and place required")
 
+    if not trip.get("plan"):
+        raise HTTPException(status_code=409, detail="Trip plan is still being generated")
+
     itinerary = trip["plan"]["itinerary"]
 
     for day in itinerary:
@@ -541,7 +706,7 @@ def add_place_to_itinerary(
     else:
         raise HTTPException(status_code=400, detail="Invalid day number")
 
-    trips_collection.update_one(
+    await trips_collection.update_one(
         {"_id": ObjectId(trip_id)},
         {"$set": {"plan.itinerary": itinerary}}
     )
@@ -558,11 +723,11 @@ def add_place_to_itinerary(
 # DELETE TRIP
 # -------------------------------------------------
 @router.delete("/{trip_id}")
-def delete_trip(
+async def delete_trip(
     trip_id: str,
     current_user: str = Depends(get_current_user)
 ):
-    trip = trips_collection.find_one({
+    trip = await trips_collection.find_one({
         "_id": ObjectId(trip_id),
         "user": current_user
     })
@@ -570,7 +735,7 @@ def delete_trip(
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
 
-    trips_collection.delete_one({
+    await trips_collection.delete_one({
         "_id": ObjectId(trip_id)
     })
 
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
 from pydantic import BaseModel , Field
 from typing import Dict, Any
 
-from app.database import wallets_collection, transactions_collection
+from app.database_async import wallets_collection, transactions_collection
 from app.core.security import get_current_user
 from app.services.razorpay_client import razorpay_client
 
@@ -33,8 +34,8 @@ def serialize_transaction(txn):
 # GET Wallet Balance
 # -------------------------------------------------
 @router.get("/")
-def get_wallet(current_user: str = Depends(get_current_user)):
-    wallet = wallets_collection.find_one({"user": current_user})
+async def get_wallet(current_user: str = Depends(get_current_user)):
+    wallet = await wallets_collection.find_one({"user": current_user})
 
     if not wallet:
         wallet = {
@@ -42,7 +43,7 @@ def get_wallet(current_user: str = Depends(get_current_user)):
             "balance": 0,
             "created_at": datetime.utcnow()
         }
-        wallets_collection.insert_one(wallet)
+        await wallets_collection.insert_one(wallet)
 
     return {
         "user": current_user,
@@ -54,7 +55,7 @@ def get_wallet(current_user: str = Depends(get_current_user)):
 # ADD Money (Manual / Testing)
 # -------------------------------------------------
 @router.post("/add")
-def add_money(
+async def add_money(
     data: dict [str, Any],
     current_user: str = Depends(get_current_user)
 ):
@@ -63,7 +64,7 @@ def add_money(
     if not isinstance(amount, int) or amount <= 0:
         raise HTTPException(status_code=400, detail="Invalid amount")
 
-    wallets_collection.update_one(
+    await wallets_collection.update_one(
         {"user": current_user},
         {
             "$inc": {"balance": amount},
@@ -72,7 +73,7 @@ def add_money(
         upsert=True
     )
 
-    transactions_collection.insert_one({
+    await transactions_collection.insert_one({
         "user": current_user,
         "type": "credit",
         "amount": amount,
@@ -80,7 +81,7 @@ def add_money(
         "created_at": datetime.utcnow()
     })
 
-    wallet = wallets_collection.find_one({"user": current_user})
+    wallet = await wallets_collection.find_one({"user": current_user})
 
     return {
         "message": "Money added successfully",
@@ -92,12 +93,12 @@ def add_money(
 # TRANSACTION HISTORY
 # -------------------------------------------------
 @router.get("/transactions")
-def wallet_transactions(current_user: str = Depends(get_current_user)):
+async def wallet_transactions(current_user: str = Depends(get_current_user)):
     txns = transactions_collection.find(
         {"user": current_user}
     ).sort("created_at", -1)
 
-    return [serialize_transaction(txn) for txn in txns]
+    return [serialize_transaction(txn) async for txn in txns]
 
 
 
@@ -105,7 +106,7 @@ def wallet_transactions(current_user: str = Depends(get_current_user)):
 # RAZORPAY ORDER CREATION
 # -------------------------------------------------
 @router.post("/create-order")
-def create_payment_order(
+async def create_payment_order(
     req: CreateOrderRequest,
     current_user: str = Depends(get_current_user)
 ):
@@ -118,8 +119,8 @@ def create_payment_order(
         raise HTTPException(status_code=400, detail="Invalid amount")
 
     try:
-        # create order in Razorpay (amount in paise)
-        order = razorpay_client.order.create({
+        # create order in Razorpay (amount in paise); the SDK is blocking
+        order = await run_in_threadpool(razorpay_client.order.create, {
             "amount": amount * 100,
             "currency": "INR",
             "payment_capture": 1
@@ -141,7 +142,7 @@ def create_payment_order(
 # RAZORPAY VERIFY PAYMENT
 # -------------------------------------------------
 @router.post("/verify-payment")
-def verify_payment(
+async def verify_payment(
     data: Dict[str, Any],
     current_user: str = Depends(get_current_user)
 ):
@@ -155,7 +156,7 @@ def verify_payment(
 
     # Verify signature using razorpay client library
     try:
-        razorpay_client.utility.verify_payment_signature({
+        await run_in_threadpool(razorpay_client.utility.verify_payment_signature, {
             "razorpay_order_id": razorpay_order_id,
             "razorpay_payment_id": razorpay_payment_id,
             "razorpay_signature": razorpay_signature
@@ -164,7 +165,7 @@ def verify_payment(
         raise HTTPException(status_code=400, detail=f"Payment verification failed: {str(e)}")
 
     # Credit wallet
-    wallets_collection.update_one(
+    await wallets_collection.update_one(
         {"user": current_user},
         {
             "$inc": {"balance": int(amount)},
@@ -174,7 +175,7 @@ def verify_payment(
     )
 
     # Save transaction
-    transactions_collection.insert_one({
+    await transactions_collection.insert_one({
         "user": current_user,
         "type": "credit",
         "amount": int(amount),
@@ -182,7 +183,7 @@ def verify_payment(
         "created_at": datetime.utcnow()
     })
 
-    wallet = wallets_collection.find_one({"user": current_user})
+    wallet = await wallets_collection.find_one({"user": current_user})
 
     return {
         "message": "Payment verified & wallet credited",
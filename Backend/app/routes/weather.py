@@ -1,53 +1,63 @@
 from fastapi import APIRouter, Query, HTTPException
-import os
-import requests
-from dotenv import load_dotenv
 from datetime import datetime
 
-load_dotenv()
+from app.config import settings
+from app.models.weather import WeatherBatchInput
+from app.services.weather import forecast_for_city, forecast_many, WeatherError
 
 router = APIRouter(prefix="/weather", tags=["Weather"])
 
-API_KEY = os.getenv("OPENWEATHER_API_KEY")
+
+def _parse_range(start_date: str, end_date: str):
+    try:
+        return datetime.fromisoformat(start_date).date(), datetime.fromisoformat(end_date).date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date/end_date must be YYYY-MM-DD")
+
 
 @router.get("/forecast")
-def get_weather_forecast(
+async def get_weather_forecast(
     city: str = Query(...),
     start_date: str = Query(...),  # YYYY-MM-DD
     end_date: str = Query(...)     # YYYY-MM-DD
 ):
-    if not API_KEY:
-        raise HTTPException(status_code=500, detail="Weather API key missing")
-
-    url = "https://api.openweathermap.org/data/2.5/forecast"
-    params = {
-        "q": city,
-        "appid": API_KEY,
-        "units": "metric"
-    }
+    start, end = _parse_range(start_date, end_date)
 
-    res = requests.get(url, params=params)
-    data = res.json()
+    # Served from the cached 3-hour series for the city's grid cell
+    try:
+        forecast = await forecast_for_city(city, start, end)
+    except WeatherError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    return {
+        "city": city,
+        "days": forecast
+    }
 
-    if res.status_code != 200:
-        raise HTTPException(status_code=400, detail=data.get("message"))
 
-    start = datetime.fromisoformat(start_date)
-    end = datetime.fromisoformat(end_date)
+@router.post("/batch")
+async def get_weather_batch(data: WeatherBatchInput):
+    """
+    Forecasts for a list of destinations (e.g. smart-destination cards)
+    in one request.
+    """
+    if len(data.destinations) > settings.WEATHER_BATCH_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.WEATHER_BATCH_MAX} destinations per request"
+        )
 
-    forecast = []
+    start, end = _parse_range(data.start_date, data.end_date)
+    destinations = [d if isinstance(d, str) else d.model_dump() for d in data.destinations]
 
-    for item in data["list"]:
-        dt = datetime.fromtimestamp(item["dt"])
-        if start.date() <= dt.date() <= end.date() and dt.hour == 12:
-            forecast.append({
-                "date": dt.date().isoformat(),
-                "temp": item["main"]["temp"],
-                "condition": item["weather"][0]["description"],
-                "icon": item["weather"][0]["icon"]
-            })
+    try:
+        results = await forecast_many(destinations, start, end)
+    except WeatherError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
     return {
-        "city": city,
-        "days": forecast
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "count": len(results),
+        "destinations": results
     }
@@ -1,32 +1,148 @@
+import asyncio
 import json
-from typing import List, Dict
+import time
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
 from app.services.groq_ai import generate_recommendations
-from app.services.scoring_engine import compute_tag_match_score, compute_final_score
+from app.services.scoring_engine import encode_tags, tag_match_scores, compute_final_scores, top_k
 from app.services.personality_engine import detect_personality
+from app.utils.cache import TTLCache, MISSING
+
+# ai_score assumed for destinations the model did not score
+NEUTRAL_AI_SCORE = 5.0
+
+# Shortlist size sent to the model. Adapted after every call so the LLM
+# stage stays inside RANK_LLM_LATENCY_BUDGET: shrink when a call runs
+# over, grow back by one when it finishes comfortably under.
+_llm_k = settings.RANK_LLM_MAX_K
+
+# LLM rankings by (preferences, candidate set), including answers that
+# arrived after the request deadline
+_ranking_cache = TTLCache(maxsize=settings.RANK_CACHE_SIZE, ttl=settings.RANK_CACHE_TTL)
+_pending: Dict[str, asyncio.Task] = {}
+
+
+def current_llm_k() -> int:
+    return _llm_k
+
+
+def _adapt_llm_k(elapsed: float, k: int) -> None:
+    global _llm_k
+    budget = settings.RANK_LLM_LATENCY_BUDGET
+    if elapsed > budget:
+        _llm_k = max(settings.RANK_LLM_MIN_K, int(k * 0.75))
+    elif elapsed < budget * 0.6 and k >= _llm_k:
+        _llm_k = min(settings.RANK_LLM_MAX_K, _llm_k + 1)
+
+
+def _ranking_key(selected_tags, companion, budget, season, candidates) -> str:
+    # the full candidate set, not the shortlist: K adapts between calls,
+    # so an answer that arrives late must still match the next query
+    return json.dumps(
+        [sorted(selected_tags or []), companion, budget, season, sorted(d["name"] for d in candidates)],
+        separators=(",", ":")
+    )
 
-def rank_destinations(
+
+def _parse_ranking(raw: str):
+    try:
+        return json.loads(raw)
+    except ValueError:
+        start = raw.find("{")
+        end = raw.rfind("}")
+        if start != -1 and end != -1:
+            try:
+                return json.loads(raw[start:end+1])
+            except ValueError:
+                print("AI JSON parse failed:", raw)
+                return None
+        print("AI returned invalid format:", raw)
+        return None
+
+
+async def _ask_llm(key: str, prompt: str, k: int) -> Optional[Dict[str, Tuple[float, str]]]:
+    """
+    Ask the model to rank the shortlist; returns {name: (ai_score, reason)}
+    (also cached under `key`) or None if it failed.
+    """
+    started = time.monotonic()
+    try:
+        raw = await generate_recommendations(prompt)
+    except Exception as e:
+        print("AI ranking error:", e)
+        return None
+    finally:
+        _adapt_llm_k(time.monotonic() - started, k)
+
+    parsed = _parse_ranking(raw) if raw else None
+    if not isinstance(parsed, dict):
+        return None
+
+    ranked = {}
+    for item in parsed.get("ranked") or []:
+        name = item.get("name") if isinstance(item, dict) else None
+        if not name or name in ranked:
+            continue
+        try:
+            ai_score = float(item.get("ai_score", NEUTRAL_AI_SCORE))
+        except (TypeError, ValueError):
+            ai_score = NEUTRAL_AI_SCORE
+        ranked[name] = (ai_score, item.get("reason", ""))
+
+    if not ranked:
+        return None
+
+    _ranking_cache.set(key, ranked)
+    return ranked
+
+
+async def rank_destinations(
     selected_tags: List[str],
     companion: str,
     budget: str,
     season: str,
-    db_results: List[Dict]
+    db_results: List[Dict],
+    llm_k: int = None,
+    deadline: float = None
 ) -> List[Dict]:
-
+    """
+    Two-stage ranking: the local tag / popularity / personality score
+    picks the top `llm_k` destinations (adaptive by default), only those
+    are ranked by the model, and the rest are merged back by local score.
+
+    The model gets `deadline` seconds (RANK_LLM_DEADLINE by default). If
+    it is late or fails, the purely local ranking is returned; when it is
+    only late, every item is flagged `ai_pending` and the answer is cached
+    for the next identical query.
+    """
     if not db_results:
         return []
-    
+
     # 🧠 Personality Engine
     personality_profile = detect_personality(selected_tags, budget, companion)
     weights = personality_profile["weight_adjustments"]
 
-    # Prepare structured data for AI
+    # 1️⃣ Local pre-selection
+    tag_masks, query_mask = encode_tags((r.get("trip_tags", []) for r in db_results), selected_tags)
+    tag_scores = tag_match_scores(tag_masks, query_mask, len(selected_tags or []))
+    popularity = np.array([r.get("popularity_score", 0) for r in db_results], dtype=np.float64)
+    neutral_ai = np.full(len(db_results), NEUTRAL_AI_SCORE)
+
+    local_scores = compute_final_scores(tag_scores, popularity, neutral_ai, weights)
+    k = llm_k or current_llm_k()
+    shortlist = top_k(local_scores, k)
+
+    # 2️⃣ LLM ranking of the shortlist only
     simplified = [
         {
-            "name": r["name"],
-            "popularity_score": r.get("popularity_score", 0),
-            "trip_tags": r.get("trip_tags", [])
+            "name": db_results[i]["name"],
+            "popularity_score": db_results[i].get("popularity_score", 0),
+            "trip_tags": db_results[i].get("trip_tags", [])
         }
-        for r in db_results
+        for i in shortlist
     ]
 
     prompt = f"""
@@ -53,7 +169,7 @@ Budget: {budget}
 Season: {season}
 
 Available destinations:
-{json.dumps(simplified, indent=2)}
+{json.dumps(simplified, separators=(',', ':'))}
 
 Return JSON:
 
@@ -72,55 +188,57 @@ The "ranked" array length MUST match the number of provided destinations.
 ai_score must be between 0 and 10.
 """
 
-    raw = generate_recommendations(prompt)
-
-    if not raw:
-        return []
-
-    try:
-        parsed = json.loads(raw)
-    except:
-        start = raw.find("{")
-        end = raw.rfind("}")
-        if start != -1 and end != -1:
-            try:
-                parsed = json.loads(raw[start:end+1])
-            except:
-                print("AI JSON parse failed:", raw)
-                return []
+    key = _ranking_key(selected_tags, companion, budget, season, db_results)
+    ranked = _ranking_cache.get(key)
+    ai_pending = False
+
+    if ranked is MISSING:
+        # identical queries in flight share one LLM call
+        task = _pending.get(key)
+        if task is None:
+            task = asyncio.create_task(_ask_llm(key, prompt, len(shortlist)))
+            _pending[key] = task
+            task.add_done_callback(lambda _: _pending.pop(key, None))
+
+        deadline = settings.RANK_LLM_DEADLINE if deadline is None else deadline
+        done, _ = await asyncio.wait({task}, timeout=deadline)
+        if done:
+            ranked = task.result()
         else:
-            print("AI returned invalid format:", raw)
-            return []
-        
-    db_map = {r["name"]: r for r in db_results}
-    final_results = []
-
-    for item in parsed.get("ranked", []):
-        name = item.get("name")
-        ai_score = float(item.get("ai_score", 5))
-        reason = item.get("reason", "")
+            # the call keeps running and caches its answer for next time
+            print("AI ranking past deadline, serving local ranking")
+            ranked = None
+            ai_pending = True
 
-        if name in db_map:
-            r = db_map[name]
+    # a cached answer may cover a larger shortlist than this call's K
+    by_name = {r["name"]: i for i, r in enumerate(db_results)}
+    ai_scores = neutral_ai.copy()
+    reasons = {}
 
-            tag_score = compute_tag_match_score(selected_tags, r["trip_tags"])
-            popularity_score = r.get("popularity_score", 0)
+    for name, (ai_score, reason) in (ranked or {}).items():
+        i = by_name.get(name)
+        if i is not None:
+            ai_scores[i] = ai_score
+            reasons[i] = reason
 
-            final_score = compute_final_score(tag_score, popularity_score, ai_score, weights)
+    # 3️⃣ Merge: model-ranked and remaining destinations, one ordering
+    final_scores = compute_final_scores(tag_scores, popularity, ai_scores, weights)
 
-            final_results.append({
-                "name": r["name"],
-                "country": r["country"],
-                "region": r["region"],
-                "trip_tags": r["trip_tags"],
-                "popularity_score": popularity_score,
-                "ai_score": ai_score,
-                "tag_score": tag_score,
-                "final_score": final_score,
-                "reason": reason
-            })
-
-    # Sort by final_score descending
-    final_results.sort(key=lambda x: x["final_score"], reverse=True)
-
-    return final_results
\ No newline at end of file
+    final_results = []
+    for i in top_k(final_scores):
+        r = db_results[i]
+        final_results.append({
+            "name": r["name"],
+            "country": r["country"],
+            "region": r["region"],
+            "trip_tags": r["trip_tags"],
+            "popularity_score": r.get("popularity_score", 0),
+            "ai_score": float(ai_scores[i]) if i in reasons else None,
+            "tag_score": float(tag_scores[i]),
+            "final_score": float(final_scores[i]),
+            "reason": reasons.get(i, ""),
+            "ranked_by": "ai" if i in reasons else "local",
+            "ai_pending": ai_pending
+        })
+
+    return final_results
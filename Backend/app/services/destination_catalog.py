@@ -0,0 +1,229 @@
+# app/services/destination_catalog.py
+"""
+In-memory snapshot of the smart_destinations catalog.
+
+The catalog is small and almost static, so it is loaded once (at startup
+or on first use) and every /smart-destination filter runs in-process.
+The list fields are encoded as bitmasks over a per-field vocabulary:
+
+    trip_tags, companion_tags, budget_levels, best_seasons
+        -> uint64[n_destinations, words]   (bit i = vocab[i] present)
+
+so "has all selected tags" is `(mask & query) == query` and "has this
+season" is `mask & query != 0`, evaluated for the whole catalog at once.
+
+The snapshot is replaced (never mutated) when the collection changes:
+a change stream triggers a reload when the server supports one,
+otherwise it is reloaded every CATALOG_REFRESH_INTERVAL seconds.
+Each load bumps `version`.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo.errors import OperationFailure
+
+from app.config import settings
+from app.database_async import smart_destinations_collection
+
+MASK_FIELDS = ("trip_tags", "companion_tags", "budget_levels", "best_seasons")
+
+_snapshot = None
+_load_lock: asyncio.Lock = None
+_watcher: asyncio.Task = None
+# False once the server has refused a change stream (standalone mongod)
+_change_streams = True
+
+# "$changeStream stage is only supported on replica sets"
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+
+class CatalogSnapshot:
+
+    def __init__(self, docs: List[Dict], version: int):
+        self.docs = docs
+        self.version = version
+        self.loaded_at = time.time()
+
+        self.vocab: Dict[str, Dict[str, int]] = {}
+        self.masks: Dict[str, np.ndarray] = {}
+
+        for field in MASK_FIELDS:
+            vocab = {}
+            for d in docs:
+                for value in d.get(field) or []:
+                    vocab.setdefault(value, len(vocab))
+            self.vocab[field] = vocab
+
+            words = max(1, (len(vocab) + 63) // 64)
+            masks = np.zeros((len(docs), words), dtype=np.uint64)
+            for i, d in enumerate(docs):
+                masks[i] = self._encode(field, d.get(field) or [], words)
+            self.masks[field] = masks
+
+        self.popularity = np.array(
+            [float(d.get("popularity_score") or 0) for d in docs],
+            dtype=np.float64
+        )
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _encode(self, field: str, values, words: int = None) -> Optional[np.ndarray]:
+        """
+        Bitmask of `values` over the field vocabulary; None if one of
+        them is unknown (no destination can have it).
+        """
+        vocab = self.vocab[field]
+        words = words or self.masks[field].shape[1]
+        mask = np.zeros(words, dtype=np.uint64)
+        for value in values:
+            bit = vocab.get(value)
+            if bit is None:
+                return None
+            mask[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return mask
+
+    def encode(self, field: str, values) -> Optional[np.ndarray]:
+        return self._encode(field, values)
+
+    def _has_all(self, field: str, values) -> np.ndarray:
+        query = self.encode(field, values)
+        if query is None:
+            return np.zeros(len(self.docs), dtype=bool)
+        return np.all((self.masks[field] & query) == query, axis=1)
+
+    def _has_any(self, field: str, values) -> np.ndarray:
+        query = self.encode(field, [v for v in values if v in self.vocab[field]])
+        return np.any(self.masks[field] & query, axis=1)
+
+    def match(
+        self,
+        trip_tags: List[str] = None,
+        companion: str = None,
+        budget: str = None,
+        season: str = None,
+        min_strict: int = 3
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Destinations having all `trip_tags`, the companion and the budget.
+        The season is preferred but relaxed when fewer than `min_strict`
+        destinations match it; candidates are ordered by constraints
+        satisfied, then popularity.
+
+        Returns (destinations, season_relaxed).
+        """
+        n = len(self.docs)
+        hard = np.ones(n, dtype=bool)
+
+        if trip_tags:
+            hard &= self._has_all("trip_tags", trip_tags)
+        if companion:
+            hard &= self._has_any("companion_tags", [companion])
+        if budget:
+            hard &= self._has_any("budget_levels", [budget])
+
+        in_season = self._has_any("best_seasons", [season]) if season else np.ones(n, dtype=bool)
+        strict = hard & in_season
+
+        relaxed = int(strict.sum()) < min_strict
+        candidates = hard if relaxed else strict
+
+        idx = np.flatnonzero(candidates)
+        # lexsort: last key is primary -> season match first, then popularity
+        order = np.lexsort((-self.popularity[idx], ~in_season[idx]))
+        return [self.docs[i] for i in idx[order]], relaxed
+
+
+# -----------------------------
+# Loading / refresh
+# -----------------------------
+async def load_snapshot() -> CatalogSnapshot:
+    global _snapshot
+    docs = await smart_destinations_collection.find({}).to_list()
+    version = _snapshot.version + 1 if _snapshot else 1
+    _snapshot = CatalogSnapshot(docs, version)
+    print(f"Destination catalog v{version}: {len(docs)} destinations")
+    return _snapshot
+
+
+async def get_snapshot() -> CatalogSnapshot:
+    """
+    Current snapshot, loading it on first use. If Mongo is unreachable an
+    empty (uncached) snapshot is returned and the next call retries.
+    """
+    global _load_lock
+    if _snapshot is not None:
+        return _snapshot
+
+    if _load_lock is None:
+        _load_lock = asyncio.Lock()
+
+    async with _load_lock:
+        if _snapshot is not None:
+            return _snapshot
+        try:
+            return await load_snapshot()
+        except Exception as e:
+            print("Destination catalog load error:", e)
+            return CatalogSnapshot([], 0)
+
+
+def _unsupported(e: OperationFailure) -> bool:
+    return e.code == CHANGE_STREAM_UNSUPPORTED or "not supported" in str(e).lower()
+
+
+async def _poll_changes():
+    while True:
+        await asyncio.sleep(settings.CATALOG_REFRESH_INTERVAL)
+        try:
+            await load_snapshot()
+        except Exception as e:
+            print("Destination catalog refresh error:", e)
+
+
+async def _watch_changes():
+    global _change_streams
+    while _change_streams:
+        try:
+            async with await smart_destinations_collection.watch() as changes:
+                async for _ in changes:
+                    await load_snapshot()
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if _unsupported(e):
+                # standalone servers have no change streams: poll from now on
+                _change_streams = False
+                print("Destination catalog change streams unavailable, polling:", e)
+                break
+            print("Destination catalog change stream error:", e)
+        except Exception as e:
+            print("Destination catalog change stream error:", e)
+
+        # stream dropped: catch up on what was missed, then watch again
+        await asyncio.sleep(settings.CATALOG_REFRESH_INTERVAL)
+        try:
+            await load_snapshot()
+        except Exception as e:
+            print("Destination catalog refresh error:", e)
+
+    await _poll_changes()
+
+
+async def start_catalog():
+    """
+    Load the snapshot and start the refresh task (app startup).
+    """
+    global _watcher
+    await get_snapshot()
+    if _watcher is None or _watcher.done():
+        _watcher = asyncio.create_task(_watch_changes())
+
+
+async def stop_catalog():
+    global _watcher
+    if _watcher is not None:
+        _watcher.cancel()
+        _watcher = None
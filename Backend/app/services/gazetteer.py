@@ -0,0 +1,298 @@
+# app/services/gazetteer.py
+"""
+Offline gazetteer built from the bundled ``app/data/gazetteer.csv``.
+
+The CSV is compiled once into a compact binary index (flat arrays + string
+blobs) which is memory-mapped on first use, so lookups never leave the
+process and the index pages are shared between workers.
+
+Index layout (little-endian, every section 4-byte aligned):
+
+    header        magic "GZT1", n_records, n_keys, keys_len, labels_len
+    key_offsets   uint32[n_keys + 1]   slices into the keys blob
+    key_records   uint32[n_keys]       record id, high bit set for aliases
+    label_offsets uint32[n_records + 1]
+    lat, lon      float32[n_records]
+    population    uint32[n_records]
+    keys blob     normalized names, sorted bytewise (the prefix structure)
+    labels blob   "name \\x1f region \\x1f country \\x1f kind" per record
+
+Every record is keyed by its full normalized name plus each trailing word
+sequence as an alias ("new delhi" is also reachable from "delhi"), so
+typeahead is a binary search for the prefix followed by a short range scan.
+"""
+import csv
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "gazetteer.csv")
+
+_MAGIC = b"GZT1"
+_HEADER = struct.Struct("<4sIIII")
+_ALIAS_BIT = 0x80000000
+_SEP = "\x1f"
+
+# Upper bound on keys inspected for one typeahead prefix
+_MAX_PREFIX_SCAN = 5000
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def normalize_name(text: str) -> str:
+    """
+    "  Reykjavík, " -> "reykjavik"
+    Accents are folded and punctuation collapsed so user input and the
+    dataset meet on the same key.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# -----------------------------
+# Build
+# -----------------------------
+def _pad4(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 4)
+
+
+def build_index(csv_path: str, index_path: str) -> None:
+    """
+    Compile the gazetteer CSV into the binary index at `index_path`.
+    """
+    records = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            name = (row.get("name") or "").strip()
+            if not name:
+                continue
+            records.append({
+                "name": name,
+                "region": (row.get("region") or "").strip(),
+                "country": (row.get("country") or "").strip(),
+                "kind": (row.get("kind") or "city").strip(),
+                "lat": float(row["lat"]),
+                "lon": float(row["lon"]),
+                "population": int(row.get("population") or 0),
+            })
+
+    keys = []
+    for rid, r in enumerate(records):
+        words = normalize_name(r["name"]).split()
+        for i in range(len(words)):
+            key = " ".join(words[i:]).encode("utf-8")
+            keys.append((key, -r["population"], rid | (_ALIAS_BIT if i else 0)))
+    keys.sort()
+
+    key_offsets, keys_blob = [0], bytearray()
+    for key, _, _ in keys:
+        keys_blob += key
+        key_offsets.append(len(keys_blob))
+
+    label_offsets, labels_blob = [0], bytearray()
+    for r in records:
+        labels_blob += _SEP.join((r["name"], r["region"], r["country"], r["kind"])).encode("utf-8")
+        label_offsets.append(len(labels_blob))
+
+    n, m = len(records), len(keys)
+    parts = [
+        _HEADER.pack(_MAGIC, n, m, len(keys_blob), len(labels_blob)),
+        struct.pack(f"<{m + 1}I", *key_offsets),
+        struct.pack(f"<{m}I", *(k[2] for k in keys)),
+        struct.pack(f"<{n + 1}I", *label_offsets),
+        struct.pack(f"<{n}f", *(r["lat"] for r in records)),
+        struct.pack(f"<{n}f", *(r["lon"] for r in records)),
+        struct.pack(f"<{n}I", *(r["population"] for r in records)),
+        _pad4(bytes(keys_blob)),
+        bytes(labels_blob),
+    ]
+
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"".join(parts))
+    os.replace(tmp_path, index_path)
+
+
+# -----------------------------
+# Read
+# -----------------------------
+class GazetteerIndex:
+    """
+    Read-only view over a memory-mapped gazetteer index.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buf = memoryview(self._mm)
+        magic, n, m, keys_len, labels_len = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Not a gazetteer index: {path}")
+
+        pos = _HEADER.size
+
+        def take(count: int, fmt: str):
+            nonlocal pos
+            view = buf[pos:pos + count * 4].cast(fmt)
+            pos += count * 4
+            return view
+
+        self.size = n
+        self._key_offsets = take(m + 1, "I")
+        self._key_records = take(m, "I")
+        self._label_offsets = take(n + 1, "I")
+        self._lat = take(n, "f")
+        self._lon = take(n, "f")
+        self._population = take(n, "I")
+        self._keys = buf[pos:pos + keys_len]
+        pos += keys_len + (-keys_len % 4)
+        self._labels = buf[pos:pos + labels_len]
+        self._n_keys = m
+
+    def _key(self, i: int) -> bytes:
+        return bytes(self._keys[self._key_offsets[i]:self._key_offsets[i + 1]])
+
+    def _lower_bound(self, key: bytes) -> int:
+        return bisect_left(range(self._n_keys), key, key=self._key)
+
+    def record(self, rid: int) -> Dict:
+        start, end = self._label_offsets[rid], self._label_offsets[rid + 1]
+        name, region, country, kind = bytes(self._labels[start:end]).decode("utf-8").split(_SEP)
+        return {
+            "name": name,
+            "region": region,
+            "country": country,
+            "kind": kind,
+            "lat": round(self._lat[rid], 5),
+            "lon": round(self._lon[rid], 5),
+            "population": self._population[rid],
+        }
+
+    def exact(self, name: str) -> List[int]:
+        """
+        Record ids whose full name normalizes to `name`, most populous first.
+        """
+        key = normalize_name(name).encode("utf-8")
+        if not key:
+            return []
+
+        ids = []
+        i = self._lower_bound(key)
+        while i < self._n_keys and self._key(i) == key:
+            rid = self._key_records[i]
+            if not rid & _ALIAS_BIT:
+                ids.append(rid)
+            i += 1
+        return ids
+
+    def prefix(self, text: str, limit: int = 5) -> List[int]:
+        """
+        Record ids with a name (or trailing word of a name) starting with
+        `text`. Full-name matches rank above word matches, then population.
+        """
+        key = normalize_name(text).encode("utf-8")
+        if not key:
+            return []
+
+        best = {}
+        i = self._lower_bound(key)
+        end = min(self._n_keys, i + _MAX_PREFIX_SCAN)
+        while i < end and self._key(i).startswith(key):
+            raw = self._key_records[i]
+            rid = raw & ~_ALIAS_BIT
+            rank = (0 if not raw & _ALIAS_BIT else 1, -self._population[rid])
+            if rid not in best or rank < best[rid]:
+                best[rid] = rank
+            i += 1
+
+        return sorted(best, key=best.get)[:limit]
+
+
+def _index_path() -> str:
+    if settings.GAZETTEER_INDEX_PATH:
+        return settings.GAZETTEER_INDEX_PATH
+    return os.path.splitext(DATA_PATH)[0] + ".idx"
+
+
+def _load_index() -> Optional[GazetteerIndex]:
+    if not os.path.exists(DATA_PATH):
+        return None
+
+    path = _index_path()
+    stale = (
+        not os.path.exists(path)
+        or os.path.getmtime(path) < os.path.getmtime(DATA_PATH)
+    )
+
+    if stale:
+        try:
+            build_index(DATA_PATH, path)
+        except OSError:
+            # package dir not writable (e.g. read-only image) -> temp dir
+            path = os.path.join(tempfile.gettempdir(), "travelease_gazetteer.idx")
+            build_index(DATA_PATH, path)
+
+    return GazetteerIndex(path)
+
+
+def get_index() -> Optional[GazetteerIndex]:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = _load_index()
+                except (OSError, ValueError) as e:
+                    print("Gazetteer load error:", e)
+                    return None
+    return _index
+
+
+# -----------------------------
+# Public API
+# -----------------------------
+def lookup(query: str) -> Optional[Dict]:
+    """
+    Resolve "Jaipur" / "Jaipur, Rajasthan, India" to a gazetteer record.
+    Extra comma-separated parts are used to disambiguate by region/country;
+    when none of the records matches them ("Paris, Texas" with only Paris,
+    France in the dataset) the result is None, not the most populous one.
+    """
+    index = get_index()
+    if index is None:
+        return None
+
+    ids = index.exact(query)
+    if ids:
+        return index.record(ids[0])
+
+    head, *context = [p for p in (query or "").split(",") if p.strip()] or [""]
+    wanted = {normalize_name(p) for p in context}
+    for rid in index.exact(head):
+        r = index.record(rid)
+        if not wanted or normalize_name(r["region"]) in wanted or normalize_name(r["country"]) in wanted:
+            return r
+
+    return None
+
+
+def suggest(prefix: str, limit: int = 5) -> List[Dict]:
+    """
+    Typeahead suggestions for `prefix`.
+    """
+    index = get_index()
+    if index is None:
+        return []
+    return [index.record(rid) for rid in index.prefix(prefix, limit)]
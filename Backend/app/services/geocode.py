@@ -1,20 +1,61 @@
-import requests
+import re
+import unicodedata
 
-def geocode_city(city: str):
-    url = "https://nominatim.openstreetmap.org/search"
+import httpx
+
+from app.config import settings
+from app.core import upstream
+from app.database import geocode_cache_collection
+from app.services import gazetteer
+from app.utils.cache import PersistentTTLCache, MISSING
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+
+# In-process LRU in front of the Mongo geocode_cache collection. Values are
+# {"lat", "lon"} dicts, or None for cities Nominatim does not know
+# (negative cache).
+_cache = PersistentTTLCache(
+    geocode_cache_collection,
+    maxsize=settings.GEOCODE_CACHE_SIZE,
+    ttl=settings.GEOCODE_CACHE_TTL,
+    name="Geocode cache"
+)
+
+
+def normalize_city(city: str) -> str:
+    """
+    Normalize a free-text city name into a cache key:
+    " New  Delhi. " -> "new delhi"
+    """
+    text = unicodedata.normalize("NFKC", city or "").casefold()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" .,;")
+
+
+async def _fetch_nominatim(city: str):
+    """
+    Returns coords, None for "no such place", or MISSING when the lookup
+    itself failed (transient errors are never cached).
+    """
     params = {
         "q": city,
         "format": "json",
         "limit": 1
     }
 
-    headers = {"User-Agent": "TravelEase/1.0"}
-    response = requests.get(url, params=params, headers=headers)
+    try:
+        response = await upstream.request("nominatim", "GET", NOMINATIM_URL, params=params)
+    except httpx.HTTPError as e:
+        print("Nominatim request error:", e)
+        return MISSING
 
     if response.status_code != 200:
-        return None
+        return MISSING
 
-    data = response.json()
+    try:
+        data = response.json()
+    except ValueError:
+        return MISSING
     if not data:
         return None
 
@@ -22,3 +63,36 @@ def geocode_city(city: str):
         "lat": float(data[0]["lat"]),
         "lon": float(data[0]["lon"])
     }
+
+
+async def geocode_city(city: str):
+    """
+    Resolve a city name to {"lat", "lon"} (or None).
+
+    Lookup order: offline gazetteer -> in-process LRU -> Mongo geocode_cache
+    -> Nominatim. Both found and not-found Nominatim answers are cached;
+    not-found ones expire sooner.
+    """
+    key = normalize_city(city)
+    if not key:
+        return None
+
+    # 1️⃣ Offline gazetteer
+    place = gazetteer.lookup(city)
+    if place:
+        return {"lat": place["lat"], "lon": place["lon"]}
+
+    # 2️⃣ In-process LRU → Mongo
+    cached = await _cache.aget(key)
+    if cached is not MISSING:
+        return dict(cached) if cached else None
+
+    # 3️⃣ Nominatim
+    coords = await _fetch_nominatim(city)
+    if coords is MISSING:
+        return None
+
+    ttl = settings.GEOCODE_CACHE_TTL if coords else settings.GEOCODE_NEGATIVE_TTL
+    await _cache.aset(key, coords, ttl=ttl)
+
+    return dict(coords) if coords else None
@@ -1,11 +1,27 @@
 import re
 import json
-import requests
-from typing import Optional, Dict, Any
+import math
+import random
+from typing import Optional, Dict, Any, AsyncIterator, Tuple
 from app.config import settings
+from app.core import upstream
+from app.database import itinerary_cache_collection
+from app.services.geocode import normalize_city
+from app.utils.cache import PersistentTTLCache, MISSING
+from app.utils.json_stream import aiter_array_items
 
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 
+# Up to ITINERARY_CACHE_VARIANTS itineraries per (destination, days,
+# budget bucket); once a key is full, plans are served from it without
+# calling Groq.
+_itinerary_cache = PersistentTTLCache(
+    itinerary_cache_collection,
+    maxsize=settings.ITINERARY_CACHE_SIZE,
+    ttl=settings.ITINERARY_CACHE_TTL,
+    name="Itinerary cache"
+)
+
 
 def _safe_parse_json(content: str) -> Optional[Dict[str, Any]]:
     """
@@ -27,15 +43,8 @@ def _safe_parse_json(content: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def generate_itinerary(destination: str, days: int, budget: str) -> Optional[Dict[str, Any]]:
-    """
-    Call Groq chat completions to generate a JSON itinerary.
-    Returns parsed JSON dict on success, or None on failure.
-    """
-    if not settings.groq_api_key:
-        return None
-
-    prompt = f"""
+def _itinerary_prompt(destination: str, days: int, budget) -> str:
+    return f"""
 Create a {days}-day travel itinerary for {destination}.
 
 Total budget: ₹{budget} INR for {days} days.
@@ -58,6 +67,82 @@ Return ONLY valid JSON in this format:
 }}
 """
 
+
+def _budget_bucket(budget) -> str:
+    """
+    Geometric budget bucket, so nearby budgets share cached itineraries:
+    with ratio 1.5, 10000 and 11000 land in the same bucket.
+    Non-numeric budgets ("low", "medium", ...) are their own bucket.
+    """
+    try:
+        amount = float(str(budget).replace(",", "").strip())
+    except ValueError:
+        return normalize_city(str(budget))
+
+    if amount <= 1:
+        return "0"
+    return str(int(math.log(amount, settings.ITINERARY_BUDGET_BUCKET_RATIO)))
+
+
+def itinerary_cache_key(destination: str, days: int, budget) -> str:
+    return f"{normalize_city(destination)}|{int(days)}|{_budget_bucket(budget)}"
+
+
+def _from_variant(variant: Dict[str, Any], destination: str, days: int, budget) -> Dict[str, Any]:
+    result = json.loads(json.dumps(variant))
+    result.update({"destination": destination, "days": days, "budget": str(budget)})
+    return result
+
+
+async def _cached_variants(key: str) -> list:
+    variants = await _itinerary_cache.aget(key)
+    return [] if variants is MISSING else list(variants or [])
+
+
+async def _remember_variant(key: str, variants: list, itinerary: Dict[str, Any]) -> None:
+    variants.append(itinerary)
+    await _itinerary_cache.aset(key, variants[-settings.ITINERARY_CACHE_VARIANTS:])
+
+
+async def generate_itinerary(destination: str, days: int, budget: str) -> Optional[Dict[str, Any]]:
+    """
+    Generate a JSON itinerary, served from the itinerary cache when the
+    (destination, days, budget bucket) key already holds enough variants.
+    Otherwise calls Groq and adds the answer as a new variant; if Groq
+    fails, any cached variant is used. Returns None when neither works.
+    """
+    try:
+        key = itinerary_cache_key(destination, days, budget)
+    except (TypeError, ValueError):
+        return await _request_itinerary(destination, days, budget)
+
+    variants = await _cached_variants(key)
+
+    if len(variants) >= settings.ITINERARY_CACHE_VARIANTS:
+        return _from_variant(random.choice(variants), destination, days, budget)
+
+    parsed = await _request_itinerary(destination, days, budget)
+
+    if isinstance(parsed, dict) and isinstance(parsed.get("itinerary"), list) and parsed["itinerary"]:
+        await _remember_variant(key, variants, parsed)
+        return parsed
+
+    if variants:
+        return _from_variant(random.choice(variants), destination, days, budget)
+
+    return parsed
+
+
+async def _request_itinerary(destination: str, days: int, budget: str) -> Optional[Dict[str, Any]]:
+    """
+    Call Groq chat completions to generate a JSON itinerary.
+    Returns parsed JSON dict on success, or None on failure.
+    """
+    if not settings.groq_api_key:
+        return None
+
+    prompt = _itinerary_prompt(destination, days, budget)
+
     headers = {
         "Authorization": f"Bearer {settings.groq_api_key}",
         "Content-Type": "application/json",
@@ -70,7 +155,7 @@ Return ONLY valid JSON in this format:
     }
 
     try:
-        resp = requests.post(GROQ_API_URL, json=payload, headers=headers, timeout=20)
+        resp = await upstream.request("groq", "POST", GROQ_API_URL, json=payload, headers=headers)
         resp.raise_for_status()
     except Exception as e:
         # network or HTTP error
@@ -109,7 +194,87 @@ Return ONLY valid JSON in this format:
     return parsed
 
 
-def generate_recommendations(prompt: str) -> str:
+async def _stream_content(resp) -> AsyncIterator[bytes]:
+    """
+    Yield the assistant text of a Groq `stream: true` response
+    (OpenAI-style SSE: "data: {...}" lines, ending with "data: [DONE]").
+    """
+    async for line in resp.aiter_lines():
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            continue
+        for choice in chunk.get("choices") or []:
+            text = (choice.get("delta") or {}).get("content")
+            if text:
+                yield text.encode("utf-8")
+
+
+async def stream_itinerary(destination: str, days: int, budget: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streaming variant of generate_itinerary. Yields (generated_by, day)
+    pairs, each itinerary[i] object as soon as the model closes it.
+
+    A full itinerary cache key is replayed as "cache"; otherwise Groq is
+    asked with `stream: true` and the days it completes are yielded as
+    "groq" and, if complete, stored as a new variant. Stops early (possibly with no
+    days) if Groq is unavailable or the stream breaks.
+    """
+    try:
+        key = itinerary_cache_key(destination, days, budget)
+    except (TypeError, ValueError):
+        key = None
+
+    variants = await _cached_variants(key) if key else []
+    if len(variants) >= settings.ITINERARY_CACHE_VARIANTS:
+        for day in _from_variant(random.choice(variants), destination, days, budget)["itinerary"]:
+            yield "cache", day
+        return
+
+    if not settings.groq_api_key:
+        return
+
+    headers = {
+        "Authorization": f"Bearer {settings.groq_api_key}",
+        "Content-Type": "application/json",
+    }
+
+    payload = {
+        "model": "llama-3.1-8b-instant",
+        "messages": [{"role": "user", "content": _itinerary_prompt(destination, days, budget)}],
+        "temperature": 0.7,
+        "stream": True,
+    }
+
+    collected = []
+    try:
+        async with upstream.stream("groq", "POST", GROQ_API_URL, json=payload, headers=headers) as resp:
+            resp.raise_for_status()
+            async for day in aiter_array_items(_stream_content(resp), "itinerary"):
+                if isinstance(day, dict):
+                    collected.append(day)
+                    yield "groq", day
+    except Exception as e:
+        print("Groq itinerary stream error:", e)
+        return
+
+    # only complete itineraries become cache variants
+    if key and len(collected) >= int(days):
+        await _remember_variant(key, variants, {
+            "destination": destination,
+            "days": days,
+            "budget": str(budget),
+            "generated_by": "groq",
+            "itinerary": collected
+        })
+
+
+async def generate_recommendations(prompt: str) -> str:
     """
     Ask the Groq model for recommendations. Returns the raw text content (string).
     On failure, returns a user-friendly error string.
@@ -135,7 +300,7 @@ def generate_recommendations(prompt: str) -> str:
     }
 
     try:
-        resp = requests.post(GROQ_API_URL, json=payload, headers=headers, timeout=20)
+        resp = await upstream.request("groq", "POST", GROQ_API_URL, json=payload, headers=headers)
         resp.raise_for_status()
     except Exception as e:
         print("Groq recommendation request error:", e)
@@ -165,7 +330,7 @@ def generate_recommendations(prompt: str) -> str:
 
 # Example usage (comment out in production)
 # if __name__ == "__main__":
-#     it = generate_itinerary("Jaipur", 3, "20000")
+#     it = asyncio.run(generate_itinerary("Jaipur", 3, "20000"))
 #     print("Itinerary:", it)
-#     rec = generate_recommendations("Tips for Jaipur, 3 days, budget 20000")
+#     rec = asyncio.run(generate_recommendations("Tips for Jaipur, 3 days, budget 20000"))
 #     print("Recommendations:", rec)
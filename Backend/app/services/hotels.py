@@ -1,10 +1,40 @@
 # app/services/hotels.py
-import requests
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
 from app.config import settings
+from app.core import upstream
+from app.database import hotel_dest_cache_collection
+from app.services.geocode import normalize_city
+from app.utils.cache import PersistentTTLCache, TTLCache, SingleFlight, MISSING
 
 DEST_URL = "https://booking-com15.p.rapidapi.com/api/v1/hotels/searchDestination"
 HOTEL_URL = "https://booking-com15.p.rapidapi.com/api/v1/hotels/searchHotels"
 
+# city -> Booking dest_id (None for cities Booking does not know). These
+# practically never change, so they live long in Mongo.
+_dest_cache = PersistentTTLCache(
+    hotel_dest_cache_collection,
+    maxsize=settings.HOTEL_DEST_CACHE_SIZE,
+    ttl=settings.HOTEL_DEST_CACHE_TTL,
+    name="Hotel destination cache"
+)
+
+# (dest_id, checkin, checkout, adults) -> (hotels, fetched_at). Fresh for
+# HOTEL_RESULT_TTL, then served stale while one background call refreshes
+# it, until HOTEL_RESULT_STALE_TTL.
+_result_cache = TTLCache(
+    maxsize=settings.HOTEL_RESULT_CACHE_SIZE,
+    ttl=settings.HOTEL_RESULT_STALE_TTL
+)
+
+# identical lookups in flight share one RapidAPI call
+_dest_flight = SingleFlight()
+_search_flight = SingleFlight()
+_revalidating = {}       # key -> background refresh task
+
 
 def get_headers():
     if not settings.rapidapi_key or not settings.rapidapi_host:
@@ -16,10 +46,11 @@ def get_headers():
     }
 
 
-
-def get_destination_id(city: str):
+async def _fetch_destination_id(city: str, key: str):
     params = {"query": city}
-    r = requests.get(
+    r = await upstream.request(
+        "rapidapi",
+        "GET",
         DEST_URL,
         headers=get_headers(),
         params=params,
@@ -28,17 +59,30 @@ def get_destination_id(city: str):
     r.raise_for_status()
 
     data = r.json()
-    if not data.get("data"):
+    dest_id = data["data"][0]["dest_id"] if data.get("data") else None
+
+    ttl = settings.HOTEL_DEST_CACHE_TTL if dest_id else settings.HOTEL_DEST_NEGATIVE_TTL
+    await _dest_cache.aset(key, dest_id, ttl=ttl)
+    return dest_id
+
+
+async def get_destination_id(city: str):
+    """
+    Booking dest_id for `city`: in-process LRU -> Mongo -> RapidAPI.
+    Upstream errors are raised and never cached.
+    """
+    key = normalize_city(city)
+    if not key:
         return None
 
-    return data["data"][0]["dest_id"]
+    cached = await _dest_cache.aget(key)
+    if cached is not MISSING:
+        return cached
 
+    return await _dest_flight.run(key, lambda: _fetch_destination_id(city, key))
 
-def search_hotels(city: str, checkin: str, checkout: str, adults: int = 2):
-    dest_id = get_destination_id(city)
-    if not dest_id:
-        return []
 
+async def _fetch_hotels(key: str, dest_id, checkin: str, checkout: str, adults: int):
     params = {
         "dest_id": dest_id,
         "dest_type": "city",
@@ -51,11 +95,12 @@ def search_hotels(city: str, checkin: str, checkout: str, adults: int = 2):
         "locale": "en-gb"
     }
 
-    r = requests.get(
+    r = await upstream.request(
+        "rapidapi",
+        "GET",
         HOTEL_URL,
         headers=get_headers(),
-        params=params,
-        timeout=20
+        params=params
     )
     r.raise_for_status()
 
@@ -71,6 +116,114 @@ def search_hotels(city: str, checkin: str, checkout: str, adults: int = 2):
             "booking_url": h.get("url")
         })
 
-        
-
+    _result_cache.set(key, (hotels, time.monotonic()))
     return hotels
+
+
+async def _revalidate(key: str, dest_id, checkin: str, checkout: str, adults: int):
+    try:
+        await _search_flight.run(key, lambda: _fetch_hotels(key, dest_id, checkin, checkout, adults))
+    except Exception as e:
+        print("Hotel search refresh error:", e)
+    finally:
+        _revalidating.pop(key, None)
+
+
+async def _search_destination(dest_id, checkin: str, checkout: str, adults: int):
+    key = f"{dest_id}|{checkin}|{checkout}|{adults}"
+
+    cached = _result_cache.get(key)
+    if cached is not MISSING:
+        hotels, fetched_at = cached
+        # stale-while-revalidate: answer now, refresh once in the background
+        if time.monotonic() - fetched_at > settings.HOTEL_RESULT_TTL and key not in _revalidating:
+            _revalidating[key] = asyncio.create_task(
+                _revalidate(key, dest_id, checkin, checkout, adults)
+            )
+        return [dict(h) for h in hotels]
+
+    hotels = await _search_flight.run(
+        key,
+        lambda: _fetch_hotels(key, dest_id, checkin, checkout, adults)
+    )
+    return [dict(h) for h in hotels]
+
+
+async def search_hotels(city: str, checkin: str, checkout: str, adults: int = 2):
+    dest_id = await get_destination_id(city)
+    if not dest_id:
+        return []
+
+    return await _search_destination(dest_id, checkin, checkout, adults)
+
+
+def _price(hotel) -> Optional[float]:
+    try:
+        return float(hotel.get("price_per_night"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def search_hotels_flexible(city: str, checkin: str, checkout: str, adults: int = 2, flex_days: int = 0):
+    """
+    Search every check-in from `checkin - flex_days` to `checkin + flex_days`
+    (same length of stay, past dates skipped), at most
+    HOTEL_FLEX_CONCURRENCY searches at a time with one shared dest_id.
+
+    Returns {"hotels": results for the requested dates, "grid": one row
+    per check-in with its prices, "cheapest": the cheapest row or None}.
+    Raises ValueError for malformed dates.
+    """
+    start = date.fromisoformat(checkin)
+    nights = max(1, (date.fromisoformat(checkout) - start).days)
+
+    dest_id = await get_destination_id(city)
+    if not dest_id:
+        return {"hotels": [], "grid": [], "cheapest": None}
+
+    today = datetime.utcnow().date()
+    shifts = [
+        start + timedelta(days=offset)
+        for offset in range(-flex_days, flex_days + 1)
+        if start + timedelta(days=offset) >= today or offset == 0
+    ]
+
+    slots = asyncio.Semaphore(settings.HOTEL_FLEX_CONCURRENCY)
+
+    async def search_shift(day: date):
+        async with slots:
+            day_out = day + timedelta(days=nights)
+            try:
+                hotels = await _search_destination(dest_id, day.isoformat(), day_out.isoformat(), adults)
+                return day, day_out, hotels, None
+            except Exception as e:
+                print("Flexible hotel search error:", day, e)
+                return day, day_out, [], str(e)
+
+    results = await asyncio.gather(*(search_shift(day) for day in shifts))
+
+    grid = []
+    requested = []
+    for day, day_out, hotels, error in results:
+        priced = [(p, h) for h in hotels for p in [_price(h)] if p is not None]
+        best_price, best_hotel = min(priced, key=lambda x: x[0]) if priced else (None, None)
+        grid.append({
+            "checkin": day.isoformat(),
+            "checkout": day_out.isoformat(),
+            "offset_days": (day - start).days,
+            "min_price": best_price,
+            "cheapest_hotel": best_hotel,
+            "prices": {h.get("name"): p for p, h in priced},
+            "hotel_count": len(hotels),
+            "is_cheapest": False,
+            "error": error
+        })
+        if day == start:
+            requested = hotels
+
+    priced_rows = [row for row in grid if row["min_price"] is not None]
+    cheapest = min(priced_rows, key=lambda row: (row["min_price"], abs(row["offset_days"]))) if priced_rows else None
+    if cheapest:
+        cheapest["is_cheapest"] = True
+
+    return {"hotels": requested, "grid": grid, "cheapest": cheapest}
@@ -1,5 +1,45 @@
 from typing import Dict
 
+DEFAULT_PERSONALITY = ("Balanced Traveler", 0.5)
+
+# Detection rules in priority order: (type, confidence, matches(trip_tags, budget, companion)).
+# The first matching rule wins; this table is also the list of types
+# precompute_explanations generates explanations for.
+PERSONALITY_RULES = [
+    ("Romantic Explorer", 0.85, lambda tags, budget, companion: "romantic" in tags and companion == "couples"),
+    ("Adventure Junkie", 0.8, lambda tags, budget, companion: "adventure" in tags),
+    ("Luxury Traveler", 0.75, lambda tags, budget, companion: budget == "premium"),
+    ("Budget Backpacker", 0.8, lambda tags, budget, companion: budget == "low"),
+    ("Family Planner", 0.85, lambda tags, budget, companion: companion == "family"),
+]
+
+# Every type detect_personality can return
+PERSONALITY_TYPES = [DEFAULT_PERSONALITY[0]] + [rule[0] for rule in PERSONALITY_RULES]
+
+DEFAULT_WEIGHTS = {
+    "tag_weight": 0.4,
+    "popularity_weight": 0.3,
+    "ai_weight": 0.3
+}
+
+WEIGHT_ADJUSTMENTS = {
+    "Luxury Traveler": {
+        "tag_weight": 0.3,
+        "popularity_weight": 0.4,
+        "ai_weight": 0.3
+    },
+    "Adventure Junkie": {
+        "tag_weight": 0.5,
+        "popularity_weight": 0.2,
+        "ai_weight": 0.3
+    },
+    "Romantic Explorer": {
+        "tag_weight": 0.4,
+        "popularity_weight": 0.2,
+        "ai_weight": 0.4
+    },
+}
+
 
 def detect_personality(trip_tags: list, budget: str, companion: str) -> Dict:
     """
@@ -7,28 +47,12 @@ def detect_personality(trip_tags: list, budget: str, companion: str) -> Dict:
     Returns personality profile.
     """
 
-    personality = "Balanced Traveler"
-    confidence = 0.5
-
-    if "romantic" in trip_tags and companion == "couples":
-        personality = "Romantic Explorer"
-        confidence = 0.85
-
-    elif "adventure" in trip_tags:
-        personality = "Adventure Junkie"
-        confidence = 0.8
-
-    elif budget == "premium":
-        personality = "Luxury Traveler"
-        confidence = 0.75
-
-    elif budget == "low":
-        personality = "Budget Backpacker"
-        confidence = 0.8
+    personality, confidence = DEFAULT_PERSONALITY
 
-    elif companion == "family":
-        personality = "Family Planner"
-        confidence = 0.85
+    for name, rule_confidence, matches in PERSONALITY_RULES:
+        if matches(trip_tags, budget, companion):
+            personality, confidence = name, rule_confidence
+            break
 
     weight_adjustments = get_weight_adjustments(personality)
 
@@ -43,30 +67,4 @@ def get_weight_adjustments(personality: str) -> Dict:
     """
     Adjust scoring weights dynamically based on personality.
     """
-
-    if personality == "Luxury Traveler":
-        return {
-            "tag_weight": 0.3,
-            "popularity_weight": 0.4,
-            "ai_weight": 0.3
-        }
-
-    if personality == "Adventure Junkie":
-        return {
-            "tag_weight": 0.5,
-            "popularity_weight": 0.2,
-            "ai_weight": 0.3
-        }
-
-    if personality == "Romantic Explorer":
-        return {
-            "tag_weight": 0.4,
-            "popularity_weight": 0.2,
-            "ai_weight": 0.4
-        }
-
-    return {
-        "tag_weight": 0.4,
-        "popularity_weight": 0.3,
-        "ai_weight": 0.3
-    }
\ No newline at end of file
+    return dict(WEIGHT_ADJUSTMENTS.get(personality, DEFAULT_WEIGHTS))
@@ -1,90 +1,654 @@
-import requests
+import asyncio
 import math
+import re
+import threading
+from itertools import islice
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from app.config import settings
+from app.core import upstream
+from app.database import place_tiles_collection, pois_collection, poi_regions_collection
+from app.utils import geohash
+from app.utils.geo import haversine_km, top_k
+from app.utils.cache import TTLCache, MISSING
+from app.utils.json_stream import aiter_array_items
 
 OVERPASS_URL = "https://overpass-api.de/api/interpreter"
 
+# Streaming mode: elements handled (and persisted) per batch
+STREAM_BATCH_SIZE = 256
+# Lifetime of a tile that is still being streamed in
+STREAM_PENDING_TTL = 600
 
 # -----------------------------
-# Distance (Haversine)
+# Category layers
 # -----------------------------
-def calculate_distance(lat1, lon1, lat2, lon2):
-    R = 6371  # km
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-
-    a = (
-        math.sin(dlat / 2) ** 2
-        + math.cos(math.radians(lat1))
-        * math.cos(math.radians(lat2))
-        * math.sin(dlon / 2) ** 2
-    )
+# A layer is one slice of OSM data we can ask Overpass for on its own.
+# Each maps to the (element, key, value) selectors that make it up;
+# value None means "any value". "tourism=<x>" layers are built on demand
+# for specific tourism categories such as "attraction" or "museum".
+LAYER_SELECTORS = {
+    "tourism": [("node", "tourism", None), ("way", "tourism", None)],
+    "restaurant": [("node", "amenity", "restaurant")],
+    "cafe": [("node", "amenity", "cafe")],
+    "historic": [("node", "historic", None)],
+}
+DEFAULT_LAYERS = ["tourism", "restaurant", "cafe", "historic"]
 
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return round(R * c, 2)
+_CATEGORY_RE = re.compile(r"^[a-z0-9_]+$")
 
+# In-process tier of the tile cache: (geohash, layer) -> list of places
+_tile_cache = TTLCache(
+    maxsize=settings.PLACES_TILE_CACHE_SIZE,
+    ttl=settings.PLACES_TILE_TTL
+)
 
-# -----------------------------
-# Nearby places via OSM
-# -----------------------------
-def fetch_nearby_places(lat, lon, radius_km=5):
-    radius_m = radius_km * 1000
+# Imported OSM regions (bounding boxes), refreshed every few minutes
+_regions_cache = TTLCache(maxsize=1, ttl=300)
+
+_indexes_ready = False
+_indexes_lock = threading.Lock()
+
+
+def category_layers(categories: Optional[List[str]] = None) -> List[str]:
+    """
+    Compile the requested UI categories into layers:
+    None -> every default layer, "attraction" -> "tourism=attraction",
+    "restaurant" -> "restaurant". Unsafe names are dropped.
+    """
+    if not categories:
+        return list(DEFAULT_LAYERS)
+
+    layers = []
+    for c in categories:
+        c = c.strip().lower()
+        if not _CATEGORY_RE.match(c):
+            continue
+        layer = c if c in LAYER_SELECTORS else f"tourism={c}"
+        if layer not in layers:
+            layers.append(layer)
+    return layers
+
+
+def _layer_selectors(layer: str) -> List[Tuple[str, str, Optional[str]]]:
+    if layer in LAYER_SELECTORS:
+        return LAYER_SELECTORS[layer]
+    key, value = layer.split("=", 1)
+    return [("node", key, value), ("way", key, value)]
+
+
+def _element_layers(element: str, tags: Dict, layers: List[str]) -> List[str]:
+    """
+    Which of `layers` an OSM element belongs to.
+    """
+    matched = []
+    for layer in layers:
+        for el, key, value in _layer_selectors(layer):
+            if el == element and key in tags and (value is None or tags[key] == value):
+                matched.append(layer)
+                break
+    return matched
 
-    query = f"""
+
+def _overpass_query(layers: List[str], bbox: str) -> str:
+    statements = []
+    for layer in layers:
+        for el, key, value in _layer_selectors(layer):
+            selector = f'["{key}"]' if value is None else f'["{key}"="{value}"]'
+            statements.append(f"      {el}{selector}({bbox});")
+
+    body = "\n".join(statements)
+    return f"""
     [out:json][timeout:25];
     (
-      node["tourism"](around:{radius_m},{lat},{lon});
-      node["amenity"="restaurant"](around:{radius_m},{lat},{lon});
-      node["amenity"="cafe"](around:{radius_m},{lat},{lon});
-      node["historic"](around:{radius_m},{lat},{lon});
-      way["tourism"](around:{radius_m},{lat},{lon});
+{body}
     );
     out center;
     """
 
-    try:
-        response = requests.post(
-            OVERPASS_URL,
-            data=query,
-            headers={"User-Agent": "TravelEase/1.0"},
-            timeout=30
-        )
-    except Exception:
+
+# -----------------------------
+# Local POI store (imported OSM extracts)
+# -----------------------------
+def _imported_regions() -> List[Dict]:
+    regions = _regions_cache.get("regions")
+    if regions is MISSING:
+        try:
+            regions = list(poi_regions_collection.find(
+                {}, {"_id": 0, "name": 1, "south": 1, "west": 1, "north": 1, "east": 1}
+            ))
+        except PyMongoError as e:
+            print("POI region read error:", e)
+            regions = []
+        _regions_cache.set("regions", regions)
+    return regions
+
+
+def _covered_by_import(lat, lon, radius_km) -> bool:
+    """
+    True when the whole search circle lies inside one imported extract.
+    """
+    r_lat = math.degrees(radius_km / 6371.0)
+    r_lon = r_lat / max(0.01, math.cos(math.radians(lat)))
+
+    return any(
+        r["south"] <= lat - r_lat and r["north"] >= lat + r_lat
+        and r["west"] <= lon - r_lon and r["east"] >= lon + r_lon
+        for r in _imported_regions()
+    )
+
+
+def _layers_mongo_filter(layers: List[str]) -> Dict:
+    clauses = []
+    for layer in layers:
+        for _, key, value in _layer_selectors(layer):
+            field = f"tags.{key}"
+            clause = {field: {"$exists": True}} if value is None else {field: value}
+            if clause not in clauses:
+                clauses.append(clause)
+    return {"$or": clauses}
+
+
+def _geo_near_pipeline(lat, lon, radius_km, layers, limit=None, offset=0) -> List[Dict]:
+    pipeline = [
+        {"$geoNear": {
+            "near": {"type": "Point", "coordinates": [lon, lat]},
+            "distanceField": "distance_m",
+            "maxDistance": radius_km * 1000,
+            "query": _layers_mongo_filter(layers),
+            "spherical": True
+        }}
+    ]
+    if offset:
+        pipeline.append({"$skip": int(offset)})
+    if limit:
+        pipeline.append({"$limit": int(limit)})
+    pipeline.append({"$project": {
+        "_id": 0,
+        "name": 1,
+        "type": 1,
+        "lat": {"$arrayElemAt": ["$location.coordinates", 1]},
+        "lon": {"$arrayElemAt": ["$location.coordinates", 0]},
+        "distance_km": {"$round": [{"$divide": ["$distance_m", 1000]}, 2]}
+    }})
+    return pipeline
+
+
+def fetch_local_places(lat, lon, radius_km=5, categories=None, limit=None, offset=0) -> Optional[List[Dict]]:
+    """
+    Nearby places from the `pois` collection via $geoNear (2dsphere).
+    Category filtering, sorting and paging all happen in Mongo.
+    Returns None when the area has not been imported.
+    """
+    if not _covered_by_import(lat, lon, radius_km):
+        return None
+
+    layers = category_layers(categories)
+    if not layers:
         return []
 
+    pipeline = _geo_near_pipeline(lat, lon, radius_km, layers, limit, offset)
+
+    try:
+        return list(pois_collection.aggregate(pipeline))
+    except PyMongoError as e:
+        print("Local POI query error:", e)
+        return None
+
+
+# -----------------------------
+# Geohash tile cache
+# -----------------------------
+def _tile_precision(radius_km: float) -> int:
+    """
+    ~4.9 km cells for normal searches, ~39 x 20 km cells for very wide
+    ones so a single request never spans hundreds of tiles.
+    """
+    return 5 if radius_km <= 15 else 4
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+
+    with _indexes_lock:
+        if _indexes_ready:
+            return
+        try:
+            place_tiles_collection.create_index([("tile", 1), ("layer", 1)], unique=True)
+            place_tiles_collection.create_index("expires_at", expireAfterSeconds=0)
+            _indexes_ready = True
+        except PyMongoError as e:
+            print("Place tile index error:", e)
+
+
+def _load_tiles(tiles: List[str], layers: List[str]) -> Dict[Tuple[str, str], List[Dict]]:
+    """
+    Cached places per (tile, layer), memory first, then Mongo.
+    Missing pairs are simply absent from the result.
+    """
+    found = {}
+    pending = []
+
+    for tile in tiles:
+        for layer in layers:
+            places = _tile_cache.get((tile, layer))
+            if places is MISSING:
+                pending.append((tile, layer))
+            else:
+                found[(tile, layer)] = places
+
+    if not pending:
+        return found
+
+    _ensure_indexes()
+    now = datetime.utcnow()
+    try:
+        docs = place_tiles_collection.find({
+            "tile": {"$in": sorted({t for t, _ in pending})},
+            "layer": {"$in": sorted({l for _, l in pending})},
+            "expires_at": {"$gt": now},
+            "complete": {"$ne": False}
+        })
+        for doc in docs:
+            key = (doc["tile"], doc["layer"])
+            found[key] = doc["places"]
+            remaining = (doc["expires_at"] - now).total_seconds()
+            _tile_cache.set(key, doc["places"], ttl=remaining)
+    except PyMongoError as e:
+        print("Place tile read error:", e)
+
+    return found
+
+
+def _store_tiles(tiles: Dict[Tuple[str, str], List[Dict]]):
+    _ensure_indexes()
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=settings.PLACES_TILE_TTL)
+
+    for (tile, layer), places in tiles.items():
+        _tile_cache.set((tile, layer), places)
+        try:
+            place_tiles_collection.update_one(
+                {"tile": tile, "layer": layer},
+                {"$set": {
+                    "places": places,
+                    "complete": True,
+                    "fetched_at": now,
+                    "expires_at": expires_at
+                }},
+                upsert=True
+            )
+        except PyMongoError as e:
+            print("Place tile write error:", e)
+
+
+def _bbox_of(tiles: List[str]):
+    """
+    (south, west, north, east) covering all `tiles`.
+    """
+    boxes = [geohash.bbox(t) for t in tiles]
+    return (
+        min(b[0] for b in boxes),
+        min(b[1] for b in boxes),
+        max(b[2] for b in boxes),
+        max(b[3] for b in boxes)
+    )
+
+
+def _element_to_place(el: Dict, layers: List[str]) -> Optional[Dict]:
+    """
+    Overpass element -> place dict (plus the layers it belongs to),
+    or None for unnamed / unlocated elements.
+    """
+    tags = el.get("tags", {})
+    name = tags.get("name")
+    if not name:
+        return None
+
+    plat = el.get("lat") or el.get("center", {}).get("lat")
+    plon = el.get("lon") or el.get("center", {}).get("lon")
+
+    if plat is None or plon is None:
+        return None
+
+    return {
+        "name": name,
+        "type": (
+            tags.get("tourism")
+            or tags.get("amenity")
+            or tags.get("historic")
+            or "place"
+        ),
+        "lat": plat,
+        "lon": plon,
+        "_layers": _element_layers(el.get("type"), tags, layers)
+    }
+
+
+async def _fetch_overpass_bbox(layers: List[str], south, west, north, east) -> Optional[List[Dict]]:
+    """
+    POIs of the given layers in a bounding box, each tagged with the
+    layers it belongs to, or None when Overpass fails.
+    """
+    query = _overpass_query(layers, f"{south},{west},{north},{east}")
+
+    try:
+        response = await upstream.request("overpass", "POST", OVERPASS_URL, content=query)
+    except httpx.HTTPError:
+        return None
+
     if response.status_code != 200 or not response.text.strip():
-        return []
+        return None
 
     try:
         data = response.json()
     except Exception:
-        return []
+        return None
 
     places = []
 
     for el in data.get("elements", []):
-        tags = el.get("tags", {})
-        name = tags.get("name")
-        if not name:
-            continue
+        place = _element_to_place(el, layers)
+        if place:
+            places.append(place)
 
-        plat = el.get("lat") or el.get("center", {}).get("lat")
-        plon = el.get("lon") or el.get("center", {}).get("lon")
+    return places
 
-        if plat is None or plon is None:
-            continue
 
-        places.append({
-            "name": name,
-            "type": (
-                tags.get("tourism")
-                or tags.get("amenity")
-                or tags.get("historic")
-                or "place"
-            ),
-            "lat": plat,
-            "lon": plon,
-            "distance_km": calculate_distance(lat, lon, plat, plon)
-        })
+async def _fetch_tiles(pending: List[Tuple[str, str]], precision: int) -> Dict[Tuple[str, str], List[Dict]]:
+    """
+    Fetch the missing (tile, layer) pairs with a single Overpass query over
+    the joint bounding box of their tiles, restricted to the missing layers,
+    and split the elements back into (tile, layer) buckets.
+    """
+    tiles = sorted({t for t, _ in pending})
+    layers = sorted({l for _, l in pending})
+
+    places = await _fetch_overpass_bbox(layers, *_bbox_of(tiles))
+    if places is None:
+        return {}
+
+    # Every tile x layer inside the query is complete and gets stored,
+    # even empty ones, so empty areas are not re-queried.
+    fetched = {(t, l): [] for t in tiles for l in layers}
+    for p in places:
+        tile = geohash.encode(p["lat"], p["lon"], precision)
+        place = {k: v for k, v in p.items() if k != "_layers"}
+        for layer in p["_layers"]:
+            if (tile, layer) in fetched:
+                fetched[(tile, layer)].append(place)
+
+    await asyncio.to_thread(_store_tiles, fetched)
+    return fetched
+
+
+# -----------------------------
+# Nearby places via OSM
+# -----------------------------
+async def fetch_nearby_places(lat, lon, radius_km=5, categories=None, limit=None, offset=0):
+    """
+    Nearby places sorted by distance, paged by `offset`/`limit`.
+    Served from the local POI store when the area has been imported,
+    otherwise from Overpass (tile-cached, only the requested categories).
+    `categories` is a list of category names, None for all.
+    """
+    local = await asyncio.to_thread(fetch_local_places, lat, lon, radius_km, categories, limit, offset)
+    if local is not None:
+        return local
+
+    layers = category_layers(categories)
+    if not layers:
+        return []
+
+    precision = _tile_precision(radius_km)
+    tiles = geohash.cover_circle(lat, lon, radius_km, precision)
+
+    cached = await asyncio.to_thread(_load_tiles, tiles, layers)
+    missing = [(t, l) for t in tiles for l in layers if (t, l) not in cached]
+    if missing:
+        cached.update(await _fetch_tiles(missing, precision))
+
+    candidates = []
+    seen = set()
+
+    for tile in tiles:
+        for layer in layers:
+            for p in cached.get((tile, layer), []):
+                key = (p["name"], p["lat"], p["lon"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                candidates.append(p)
+
+    if not candidates:
+        return []
+
+    # One vectorized distance pass + partial sort for the requested page
+    distances = np.round(haversine_km(
+        lat,
+        lon,
+        [p["lat"] for p in candidates],
+        [p["lon"] for p in candidates]
+    ), 2)
+    inside = np.flatnonzero(distances <= radius_km)
+    order = inside[top_k(distances[inside], (offset + limit) if limit else None)]
+    order = order[offset:]
+
+    return [
+        {**candidates[i], "distance_km": float(distances[i])}
+        for i in order
+    ]
+
+
+# -----------------------------
+# Streaming (NDJSON) variant
+# -----------------------------
+def _with_distances(lat, lon, radius_km, batch: List[Dict]) -> List[Dict]:
+    if not batch:
+        return []
+    distances = np.round(haversine_km(
+        lat, lon, [p["lat"] for p in batch], [p["lon"] for p in batch]
+    ), 2)
+    return [
+        {**p, "distance_km": float(d)}
+        for p, d in zip(batch, distances)
+        if d <= radius_km
+    ]
+
+
+def _begin_stream_tiles(pairs: List[Tuple[str, str]]):
+    """
+    Reset the tiles about to be streamed in. They stay invisible to
+    readers (complete=False) and expire quickly if the stream dies.
+    """
+    _ensure_indexes()
+    now = datetime.utcnow()
+    try:
+        place_tiles_collection.bulk_write([
+            UpdateOne(
+                {"tile": t, "layer": l},
+                {"$set": {
+                    "places": [],
+                    "complete": False,
+                    "expires_at": now + timedelta(seconds=STREAM_PENDING_TTL)
+                }},
+                upsert=True
+            )
+            for t, l in pairs
+        ], ordered=False)
+        return True
+    except PyMongoError as e:
+        print("Place tile write error:", e)
+        return False
+
+
+def _append_stream_tiles(buckets: Dict[Tuple[str, str], List[Dict]]):
+    ops = [
+        UpdateOne({"tile": t, "layer": l}, {"$push": {"places": {"$each": places}}})
+        for (t, l), places in buckets.items() if places
+    ]
+    if not ops:
+        return
+    try:
+        place_tiles_collection.bulk_write(ops, ordered=False)
+    except PyMongoError as e:
+        print("Place tile write error:", e)
+
+
+def _finish_stream_tiles(pairs: List[Tuple[str, str]]):
+    now = datetime.utcnow()
+    try:
+        place_tiles_collection.update_many(
+            {"$or": [{"tile": t, "layer": l} for t, l in pairs]},
+            {"$set": {
+                "complete": True,
+                "fetched_at": now,
+                "expires_at": now + timedelta(seconds=settings.PLACES_TILE_TTL)
+            }}
+        )
+    except PyMongoError as e:
+        print("Place tile write error:", e)
+
+
+def _next_batch(cursor) -> List[Dict]:
+    return list(islice(cursor, STREAM_BATCH_SIZE))
+
+
+async def stream_nearby_places(lat, lon, radius_km=5, categories=None, limit=None) -> AsyncIterator[Dict]:
+    """
+    Same sources as fetch_nearby_places, but yields places as they become
+    available instead of building one sorted list: cached tiles first, then
+    Overpass elements decoded straight off the socket. Output is NOT sorted
+    by distance. Memory per request is bounded by the batch size; fetched
+    tiles are persisted to Mongo batch by batch (not to the in-process
+    tier, which would mean holding them).
+    """
+    emitted = 0
+
+    def take(places):
+        nonlocal emitted
+        for p in places:
+            if limit and emitted >= limit:
+                return
+            emitted += 1
+            yield p
+
+    # 1️⃣ Imported area: stream the $geoNear cursor
+    if await asyncio.to_thread(_covered_by_import, lat, lon, radius_km):
+        layers = category_layers(categories)
+        if not layers:
+            return
+        try:
+            cursor = await asyncio.to_thread(
+                pois_collection.aggregate,
+                _geo_near_pipeline(lat, lon, radius_km, layers, limit),
+                batchSize=STREAM_BATCH_SIZE
+            )
+        except PyMongoError as e:
+            print("Local POI query error:", e)
+            cursor = None
+
+        if cursor is not None:
+            while True:
+                batch = await asyncio.to_thread(_next_batch, cursor)
+                if not batch:
+                    return
+                for p in take(batch):
+                    yield p
+                if limit and emitted >= limit:
+                    return
+
+    layers = category_layers(categories)
+    if not layers:
+        return
+
+    precision = _tile_precision(radius_km)
+    tiles = geohash.cover_circle(lat, lon, radius_km, precision)
+
+    # 2️⃣ Cached tiles
+    cached = await asyncio.to_thread(_load_tiles, tiles, layers)
+    seen = set()
+    for tile in tiles:
+        batch = []
+        for layer in layers:
+            for p in cached.get((tile, layer), []):
+                key = (p["name"], p["lat"], p["lon"])
+                if key not in seen:
+                    seen.add(key)
+                    batch.append(p)
+        for p in take(_with_distances(lat, lon, radius_km, batch)):
+            yield p
+        if limit and emitted >= limit:
+            return
+
+    missing = [(t, l) for t in tiles for l in layers if (t, l) not in cached]
+    if not missing:
+        return
+
+    # 3️⃣ Missing tiles straight from Overpass
+    miss_tiles = sorted({t for t, _ in missing})
+    miss_layers = sorted({l for _, l in missing})
+    south, west, north, east = _bbox_of(miss_tiles)
+    query = _overpass_query(miss_layers, f"{south},{west},{north},{east}")
+    # only the pairs not cached: cached ones are already complete
+    wanted = set(missing)
+
+    try:
+        async with upstream.stream("overpass", "POST", OVERPASS_URL, content=query) as response:
+            if response.status_code != 200:
+                return
+
+            persist = await asyncio.to_thread(_begin_stream_tiles, sorted(wanted))
+            batch, buckets = [], {}
+            pending = 0
+
+            async def flush():
+                nonlocal pending
+                if persist:
+                    await asyncio.to_thread(_append_stream_tiles, dict(buckets))
+                out = _with_distances(lat, lon, radius_km, batch)
+                batch.clear()
+                buckets.clear()
+                pending = 0
+                return out
+
+            async for el in aiter_array_items(response.aiter_bytes(16384), "elements"):
+                place = _element_to_place(el, miss_layers)
+                if not place:
+                    continue
+
+                tile = geohash.encode(place["lat"], place["lon"], precision)
+                layers_hit = place.pop("_layers")
+
+                for layer in layers_hit:
+                    if (tile, layer) in wanted:
+                        buckets.setdefault((tile, layer), []).append(place)
+
+                # already emitted from a cached (tile, layer): store, don't repeat
+                if not any((tile, l) in cached for l in layers_hit):
+                    batch.append(place)
+                pending += 1
+
+                if pending >= STREAM_BATCH_SIZE:
+                    for p in take(await flush()):
+                        yield p
+                    if limit and emitted >= limit:
+                        return
 
-    return sorted(places, key=lambda x: x["distance_km"])
+            for p in take(await flush()):
+                yield p
+    except Exception as e:
+        # connection dropped mid-stream: pending tiles simply expire
+        print("Overpass stream error:", e)
+        return
 
+    if persist:
+        await asyncio.to_thread(_finish_stream_tiles, sorted(wanted))
@@ -0,0 +1,140 @@
+# app/services/plan_jobs.py
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+from app.config import settings
+from app.database_async import trips_collection
+from app.services.geocode import geocode_city
+from app.services.planner import smart_trip_planner
+
+# Plan jobs run as event-loop tasks, at most PLAN_JOB_WORKERS at a time,
+# so slow LLM / routing upstreams never hold a request thread. The trip
+# document itself is the job record: status "planning" -> "planned" |
+# "failed", with one plan_events entry per settled stage.
+_job_slots: asyncio.Semaphore = None
+_running = set()
+
+
+def _update_trip(trip_id: ObjectId, update: Dict[str, Any]):
+    return trips_collection.update_one({"_id": trip_id}, update)
+
+
+async def _push_event(trip_id: ObjectId, stage: str, source: str = None):
+    event = {"stage": stage, "source": source, "at": datetime.utcnow()}
+    await _update_trip(trip_id, {"$push": {"plan_events": event}})
+
+
+async def _run_plan_job(trip_id: ObjectId, source: str, destination: str, budget: int, days: int, people: int):
+    global _job_slots
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(settings.PLAN_JOB_WORKERS)
+
+    async with _job_slots:
+        try:
+            plan = await smart_trip_planner(
+                source,
+                destination,
+                budget,
+                days,
+                people,
+                on_stage=lambda stage, src: _push_event(trip_id, stage, src)
+            )
+
+            coords = await geocode_city(destination)
+            if not coords:
+                await _update_trip(
+                    trip_id,
+                    {"$set": {"status": "failed", "plan_error": "Unable to locate destination city"}}
+                )
+                await _push_event(trip_id, "failed")
+                return
+
+            await _update_trip(
+                trip_id,
+                {"$set": {
+                    "plan": plan,
+                    "lat": coords["lat"],
+                    "lon": coords["lon"],
+                    "coordinates": coords,
+                    "status": "planned"
+                }}
+            )
+            await _push_event(trip_id, "planned")
+
+        except Exception as e:
+            print("Plan job error:", e)
+            await _update_trip(
+                trip_id,
+                {"$set": {"status": "failed", "plan_error": "Plan generation failed"}}
+            )
+            await _push_event(trip_id, "failed")
+
+
+def submit_plan_job(trip_id: ObjectId, source: str, destination: str, budget: int, days: int, people: int):
+    """
+    Start a plan job on the running event loop and return immediately.
+    """
+    task = asyncio.create_task(_run_plan_job(trip_id, source, destination, budget, days, people))
+    # keep a reference until done, the loop only holds weak ones
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+
+
+async def _sweep_interrupted_jobs():
+    """
+    Fail the trips left in "planning" by a restart or crash. A job only
+    lives in the process that started it, so a "planning" trip older than
+    PLAN_JOB_STALE_AFTER has no job any more; younger ones may belong to
+    another worker. Runs once at startup and once more after that age, for
+    jobs the previous process had only just started.
+    """
+    for delay in (0, settings.PLAN_JOB_STALE_AFTER):
+        await asyncio.sleep(delay)
+        now = datetime.utcnow()
+        try:
+            result = await trips_collection.update_many(
+                {
+                    "status": "planning",
+                    "created_at": {"$lt": now - timedelta(seconds=settings.PLAN_JOB_STALE_AFTER)}
+                },
+                {
+                    "$set": {"status": "failed", "plan_error": "Plan generation was interrupted"},
+                    "$push": {"plan_events": {"stage": "failed", "source": None, "at": now}}
+                }
+            )
+            if result.modified_count:
+                print(f"Plan jobs: {result.modified_count} interrupted jobs marked failed")
+        except PyMongoError as e:
+            print("Plan job sweep error:", e)
+
+
+def start_job_sweeper():
+    """
+    Start the interrupted-job sweep in the background (app startup).
+    """
+    task = asyncio.create_task(_sweep_interrupted_jobs())
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+
+
+def serialize_job(trip: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": str(trip["_id"]),
+        "trip_id": str(trip["_id"]),
+        "status": trip.get("status"),
+        "events": [
+            {
+                "stage": e.get("stage"),
+                "source": e.get("source"),
+                "at": e["at"].isoformat() if e.get("at") else None
+            }
+            for e in trip.get("plan_events", [])
+        ],
+        "error": trip.get("plan_error"),
+        "coordinates": trip.get("coordinates"),
+        "plan": trip.get("plan") if trip.get("status") == "planned" else None
+    }
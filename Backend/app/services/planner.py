@@ -1,18 +1,131 @@
 # app/services/planner.py
-from typing import Any, Dict
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
 
+from app.config import settings
 from app.services.transport import get_transport_options
 from app.services.groq_ai import generate_itinerary
 from app.services.geocode import geocode_city
 from app.utils.fallback_itinerary import fallback_itinerary
 
 
-def smart_trip_planner(
+# -----------------------------
+# Stages
+# -----------------------------
+async def _itinerary_stage(destination: str, days: int, budget: int):
+    ai_result = await generate_itinerary(destination, days, budget)
+    if isinstance(ai_result, dict) and "itinerary" in ai_result:
+        return ai_result["itinerary"]
+    return None
+
+
+async def _transport_stage(source: str, destination: str, budget: int, days: int) -> Optional[Dict[str, Any]]:
+    origin_coords, dest_coords = await asyncio.gather(
+        geocode_city(source),
+        geocode_city(destination)
+    )
+
+    if not (origin_coords and dest_coords):
+        return None
+
+    return await get_transport_options(
+        origin_coords["lat"],
+        origin_coords["lon"],
+        dest_coords["lat"],
+        dest_coords["lon"],
+        days=days,
+        budget=budget,
+    )
+
+
+async def _await_stage(task: asyncio.Task, name: str, timeout: float, deadline: float):
+    """
+    Result of a stage, or None if it failed or did not finish within
+    min(timeout, time left until the plan deadline). A stage that runs
+    out of time is cancelled, which also releases its upstream connection.
+    """
+    wait = max(0.0, min(timeout, deadline - time.monotonic()))
+    try:
+        return await asyncio.wait_for(task, timeout=wait)
+    except asyncio.TimeoutError:
+        print(f"Planner {name} stage timed out after {wait:.1f}s")
+    except Exception as e:
+        print(f"Planner {name} stage error:", e)
+    return None
+
+
+async def _notify(on_stage, stage: str, source: str):
+    if on_stage is None:
+        return
+    try:
+        await on_stage(stage, source)
+    except Exception as e:
+        print("Planner stage callback error:", e)
+
+
+def fallback_transport(budget: int, days: int) -> Dict[str, Any]:
+    """
+    Heuristic transport options when routing is unavailable.
+    """
+    if budget < 5000:
+        recommended = "train"
+        options = [
+            {
+                "mode": "train",
+                "duration_hours": days * 6,
+                "estimated_cost": int(budget * 0.25),
+                "reason": "Lowest cost option for small budget",
+            }
+        ]
+    elif budget < 12000:
+        recommended = "train"
+        options = [
+            {
+                "mode": "train",
+                "duration_hours": days * 4,
+                "estimated_cost": int(budget * 0.3),
+                "reason": "Balanced cost vs comfort",
+            },
+            {
+                "mode": "flight",
+                "duration_hours": days * 1.5,
+                "estimated_cost": int(budget * 0.6),
+                "reason": "Faster but more expensive",
+            },
+        ]
+    else:
+        recommended = "flight"
+        options = [
+            {
+                "mode": "flight",
+                "duration_hours": days * 1.0,
+                "estimated_cost": int(budget * 0.55),
+                "reason": "Fastest and most comfortable",
+            },
+            {
+                "mode": "train",
+                "duration_hours": days * 3,
+                "estimated_cost": int(budget * 0.25),
+                "reason": "Cheaper backup option",
+            },
+        ]
+
+    return {
+        "distance_km": None,
+        "recommended": recommended,
+        "options": options,
+        "raw_route": None,
+    }
+
+
+async def smart_trip_planner(
     source: str,
     destination: str,
     budget: int,
     days: int,
-    people: int
+    people: int,
+    on_stage: Optional[Callable[[str, str], Awaitable[None]]] = None
 ) -> Dict[str, Any]:
     """
     Smart Trip Planner (Numeric Budget)
@@ -22,100 +135,48 @@ def smart_trip_planner(
     - Fetches transport options via ORS
     - Estimates total cost
     - Returns a single, stable plan object
-    """
 
-    # -----------------------------
-    # 1️⃣ AI Itinerary (Groq → fallback)
-    # -----------------------------
-    try:
-        ai_result = generate_itinerary(destination, days, budget)
-        if isinstance(ai_result, dict) and "itinerary" in ai_result:
-            itinerary = ai_result["itinerary"]
-        else:
-            itinerary = fallback_itinerary(destination, days, budget)["itinerary"]
-    except Exception:
-        itinerary = fallback_itinerary(destination, days, budget)["itinerary"]
+    The itinerary and geocode → route stages run concurrently, each bounded
+    by its own timeout and by PLAN_DEADLINE overall; a stage that misses
+    its slice is replaced by its fallback.
+
+    `await on_stage(stage, source)` is called as "transport" and "itinerary"
+    are settled, with source "ors" / "haversine" / "ai" or "fallback".
+    """
+    deadline = time.monotonic() + settings.PLAN_DEADLINE
 
     # -----------------------------
-    # 2️⃣ Geocode source & destination
+    # 1️⃣ Start AI itinerary and geocode → transport in parallel
     # -----------------------------
-    origin_coords = geocode_city(source)
-    dest_coords = geocode_city(destination)
-
-    transport = None
+    itinerary_task = asyncio.create_task(_itinerary_stage(destination, days, budget))
+    transport_task = asyncio.create_task(_transport_stage(source, destination, budget, days))
 
     # -----------------------------
-    # 3️⃣ Transport options (ORS)
+    # 2️⃣ Transport options (ORS → heuristic)
+    #    (usually ready well before the LLM, so settled first)
     # -----------------------------
-    if origin_coords and dest_coords:
-        try:
-            transport = get_transport_options(
-                origin_coords["lat"],
-                origin_coords["lon"],
-                dest_coords["lat"],
-                dest_coords["lon"],
-                days=days,
-                budget=budget,
-            )
-        except Exception:
-            transport = None
+    transport = await _await_stage(transport_task, "transport", settings.PLAN_TRANSPORT_TIMEOUT, deadline)
+    if not transport:
+        transport_source = "fallback"
+        transport = fallback_transport(budget, days)
+    elif transport.get("raw_route"):
+        # ORS failed: distances are get_transport_options' haversine estimate
+        transport_source = "haversine"
+    else:
+        transport_source = "ors"
+    await _notify(on_stage, "transport", transport_source)
 
     # -----------------------------
-    # 4️⃣ Transport fallback (heuristic)
+    # 3️⃣ AI Itinerary (Groq → fallback)
     # -----------------------------
-    if not transport:
-        if budget < 5000:
-            recommended = "train"
-            options = [
-                {
-                    "mode": "train",
-                    "duration_hours": days * 6,
-                    "estimated_cost": int(budget * 0.25),
-                    "reason": "Lowest cost option for small budget",
-                }
-            ]
-        elif budget < 12000:
-            recommended = "train"
-            options = [
-                {
-                    "mode": "train",
-                    "duration_hours": days * 4,
-                    "estimated_cost": int(budget * 0.3),
-                    "reason": "Balanced cost vs comfort",
-                },
-                {
-                    "mode": "flight",
-                    "duration_hours": days * 1.5,
-                    "estimated_cost": int(budget * 0.6),
-                    "reason": "Faster but more expensive",
-                },
-            ]
-        else:
-            recommended = "flight"
-            options = [
-                {
-                    "mode": "flight",
-                    "duration_hours": days * 1.0,
-                    "estimated_cost": int(budget * 0.55),
-                    "reason": "Fastest and most comfortable",
-                },
-                {
-                    "mode": "train",
-                    "duration_hours": days * 3,
-                    "estimated_cost": int(budget * 0.25),
-                    "reason": "Cheaper backup option",
-                },
-            ]
-
-        transport = {
-            "distance_km": None,
-            "recommended": recommended,
-            "options": options,
-            "raw_route": None,
-        }
+    itinerary = await _await_stage(itinerary_task, "itinerary", settings.PLAN_ITINERARY_TIMEOUT, deadline)
+    itinerary_source = "ai" if itinerary else "fallback"
+    if not itinerary:
+        itinerary = fallback_itinerary(destination, days, budget)["itinerary"]
+    await _notify(on_stage, "itinerary", itinerary_source)
 
     # -----------------------------
-    # 5️⃣ Hotel decision (numeric)
+    # 4️⃣ Hotel decision (numeric)
     # -----------------------------
     if budget < 6000:
         hotel = "Hostel / Budget Stay"
@@ -125,7 +186,7 @@ def smart_trip_planner(
         hotel = "4-Star Hotel"
 
     # -----------------------------
-    # 6️⃣ Cost estimation
+    # 5️⃣ Cost estimation
     # -----------------------------
     cheapest_transport = min(
         transport["options"], key=lambda x: x.get("estimated_cost", 10**9)
@@ -139,12 +200,12 @@ def smart_trip_planner(
     total_estimated_cost = int(estimated_per_person * people)
 
     # -----------------------------
-    # 7️⃣ Confidence score
+    # 6️⃣ Confidence score
     # -----------------------------
     confidence = 0.7 if transport.get("distance_km") else 0.5
 
     # -----------------------------
-    # 8️⃣ FINAL RESPONSE
+    # 7️⃣ FINAL RESPONSE
     # -----------------------------
     return {
         "source": source,
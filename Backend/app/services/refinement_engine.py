@@ -2,7 +2,7 @@ import json
 from app.services.groq_ai import generate_recommendations
 
 
-def interpret_refinement(instruction: str):
+async def interpret_refinement(instruction: str):
 
     prompt = f"""
 You are a travel AI system.
@@ -39,7 +39,7 @@ No explanation.
 Only JSON.
 """
 
-    ai_text = generate_recommendations(prompt)
+    ai_text = await generate_recommendations(prompt)
 
     try:
         parsed = json.loads(ai_text)
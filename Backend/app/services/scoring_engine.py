@@ -1,3 +1,7 @@
+from typing import Iterable, Tuple
+
+import numpy as np
+
 from app.config import settings
 
 
@@ -34,4 +38,118 @@ def compute_final_score(
         crowd_penalty * crowd_factor
     )
 
-    return round(final, 2)
\ No newline at end of file
+    return round(final, 2)
+
+# -----------------------------
+# Batch scoring (columnar, one NumPy pass)
+# -----------------------------
+def encode_tags(tag_lists: Iterable[list], selected_tags: list) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bitmasks over `selected_tags` (bit i = selected_tags[i]) for every
+    destination's tag list, plus the query mask with all selected bits.
+    Shapes: (n, words) and (words,).
+    """
+    bits = {}
+    for tag in selected_tags or []:
+        bits.setdefault(tag, len(bits))
+
+    words = max(1, (len(bits) + 63) // 64)
+    query = np.zeros(words, dtype=np.uint64)
+    for bit in bits.values():
+        query[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+
+    if words == 1:
+        masks = np.fromiter(
+            (sum(1 << bits[t] for t in set(tags or []) if t in bits) for tags in tag_lists),
+            dtype=np.uint64
+        ).reshape(-1, 1)
+        return masks, query
+
+    rows = []
+    for tags in tag_lists:
+        row = [0] * words
+        for t in set(tags or []):
+            if t in bits:
+                row[bits[t] // 64] |= 1 << (bits[t] % 64)
+        rows.append(row)
+    return np.array(rows, dtype=np.uint64).reshape(-1, words), query
+
+
+def tag_match_scores(tag_masks: np.ndarray, query_mask: np.ndarray, n_selected: int) -> np.ndarray:
+    """
+    compute_tag_match_score for a whole column of destinations.
+    """
+    if not n_selected:
+        return np.full(len(tag_masks), 5.0)
+
+    matches = np.bitwise_count(tag_masks & query_mask).sum(axis=1)
+    return np.round(matches / n_selected * 10, 2)
+
+
+def weight_vector(weights: dict) -> np.ndarray:
+    """
+    [tag, popularity, ai, crowd_penalty] with compute_final_score's defaults.
+    """
+    return np.array([
+        weights.get("tag_weight", 0.4),
+        weights.get("popularity_weight", 0.3),
+        weights.get("ai_weight", 0.3),
+        weights.get("crowd_penalty", 0)
+    ], dtype=np.float64)
+
+
+def compute_final_scores(
+    tag_scores,
+    popularity_scores,
+    ai_scores,
+    weights,
+    crowd_factors=None
+) -> np.ndarray:
+    """
+    compute_final_score over columns; `weights` is a dict or weight_vector().
+    """
+    w = weights if isinstance(weights, np.ndarray) else weight_vector(weights)
+    columns = np.vstack([
+        np.asarray(tag_scores, dtype=np.float64),
+        np.asarray(popularity_scores, dtype=np.float64),
+        np.asarray(ai_scores, dtype=np.float64),
+        -np.asarray(
+            np.zeros(len(tag_scores)) if crowd_factors is None else crowd_factors,
+            dtype=np.float64
+        )
+    ])
+    return np.round(w @ columns, 2)
+
+
+def top_k(scores: np.ndarray, k: int = None) -> np.ndarray:
+    """
+    Indices of the k best scores (all when k is None), best first.
+    Ties keep their input order.
+    """
+    n = len(scores)
+    k = n if k is None else max(0, min(k, n))
+    if k == 0:
+        return np.array([], dtype=np.intp)
+    if k < n:
+        # k-th best score, then everything above it plus the earliest ties
+        threshold = np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(-scores < threshold)
+        ties = np.flatnonzero(-scores == threshold)[:k - len(above)]
+        candidates = np.concatenate([above, ties])
+        return candidates[np.lexsort((candidates, -scores[candidates]))]
+    return np.argsort(-scores, kind="stable")
+
+
+def score_batch(
+    tag_scores,
+    popularity_scores,
+    ai_scores,
+    weights,
+    crowd_factors=None,
+    k: int = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Final scores for every destination and the top-k ordering, in one call.
+    """
+    final = compute_final_scores(tag_scores, popularity_scores, ai_scores, weights, crowd_factors)
+    return final, top_k(final, k)
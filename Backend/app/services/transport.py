@@ -1,12 +1,38 @@
 # app/services/transport.py
-import math
-import requests
-from typing import Dict, Any, Optional
+import asyncio
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
 from app.config import settings
+from app.core import upstream
+from app.database import route_cache_collection
+from app.utils.cache import PersistentTTLCache, MISSING
+from app.utils.geo import haversine_km
 
 ORS_URL_BASE = "https://api.openrouteservice.org/v2/directions"
+ORS_MATRIX_URL_BASE = "https://api.openrouteservice.org/v2/matrix"
+
+# Successful ORS summaries, keyed by snapped coordinates + profile
+_route_cache = PersistentTTLCache(
+    route_cache_collection,
+    maxsize=settings.ROUTE_CACHE_SIZE,
+    ttl=settings.ROUTE_CACHE_TTL,
+    name="Route cache"
+)
+
 
-def get_route(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float, profile: str = "driving-car") -> Dict[str, Any]:
+def route_cache_key(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float, profile: str) -> str:
+    """
+    Snap both ends to a ROUTE_SNAP_DEG grid so nearby coordinates for the
+    same city pair share one entry. Direction is kept (A->B != B->A).
+    """
+    snap = settings.ROUTE_SNAP_DEG
+    cells = (round(v / snap) for v in (origin_lat, origin_lon, dest_lat, dest_lon))
+    return profile + ":" + ":".join(str(c) for c in cells)
+
+
+async def get_route(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float, profile: str = "driving-car") -> Dict[str, Any]:
     """
     Calls OpenRouteService directions API and returns a normalized summary.
 
@@ -20,7 +46,15 @@ def get_route(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: f
       "duration_hours": float,
       "raw_summary": {...}   # optional
     }
+
+    Successful routes are cached (in-process LRU + Mongo) per snapped
+    coordinate pair and profile; failures are never cached.
     """
+    key = route_cache_key(origin_lat, origin_lon, dest_lat, dest_lon, profile)
+    cached = await _route_cache.aget(key)
+    if cached is not MISSING:
+        return dict(cached)
+
     if not settings.ors_api_key:
         raise RuntimeError("OPENROUTESERVICE API key (ors_api_key) is missing in settings")
 
@@ -38,10 +72,10 @@ def get_route(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: f
     }
 
     try:
-        resp = requests.post(url, json=body, headers=headers, timeout=20)
+        resp = await upstream.request("ors", "POST", url, json=body, headers=headers)
         resp.raise_for_status()
         data = resp.json()
-    except requests.RequestException as e:
+    except (httpx.HTTPError, ValueError) as e:
         return {
             "status": "no_route",
             "provider": "openrouteservice",
@@ -69,7 +103,7 @@ def get_route(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: f
     distance_m = summary.get("distance", 0)  # meters
     duration_s = summary.get("duration", 0)  # seconds
 
-    return {
+    route = {
         "status": "ok",
         "provider": "openrouteservice",
         "mode": profile,
@@ -78,6 +112,30 @@ def get_route(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: f
         "duration_hours": round(duration_s / 3600.0, 2),
         "raw_summary": summary,
     }
+    await _route_cache.aset(key, route)
+
+    return dict(route)
+
+
+# Base per-km rates (INR)
+COST_RATES = {
+    "car": 8,
+    "train": 2,
+    "flight": 6
+}
+
+
+def _budget_level(budget_level) -> str:
+    """
+    Normalize numeric (INR) or string budgets to "low" | "medium" | "high" | <str>.
+    """
+    if isinstance(budget_level, (int, float)):
+        if budget_level < 5000:
+            return "low"
+        elif budget_level < 15000:
+            return "medium"
+        return "high"
+    return str(budget_level).lower()
 
 
 def _cost_estimates(distance_km: float, budget_level):
@@ -86,23 +144,9 @@ def _cost_estimates(distance_km: float, budget_level):
     Returns estimated costs for car/train/flight.
     """
 
-    # Normalize budget
-    if isinstance(budget_level, (int, float)):
-        if budget_level < 5000:
-            level = "low"
-        elif budget_level < 15000:
-            level = "medium"
-        else:
-            level = "high"
-    else:
-        level = str(budget_level).lower()
+    level = _budget_level(budget_level)
 
-    # Base per-km rates
-    rates = {
-        "car": 8,
-        "train": 2,
-        "flight": 6
-    }
+    rates = COST_RATES
 
     costs = {
         "car": int(distance_km * rates["car"]),
@@ -119,7 +163,7 @@ def _cost_estimates(distance_km: float, budget_level):
     return costs
 
 
-def get_transport_options(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float, days: Optional[int] = None, budget: Optional[str] = None) -> Dict[str, Any]:
+async def get_transport_options(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float, days: Optional[int] = None, budget: Optional[str] = None) -> Dict[str, Any]:
     """
     Compute and return transport options given origin/destination coordinates.
 
@@ -136,7 +180,7 @@ def get_transport_options(origin_lat: float, origin_lon: float, dest_lat: float,
     This function calls get_route to get driving distance/duration and uses simple rules to propose options.
     """
     # 1) Get driving route summary (best-effort)
-    route = get_route(origin_lat, origin_lon, dest_lat, dest_lon, profile="driving-car")
+    route = await get_route(origin_lat, origin_lon, dest_lat, dest_lon, profile="driving-car")
 
     # If ORS gave a usable distance, use it. Otherwise fall back to great-circle estimate.
     if route.get("status") == "ok" and route.get("distance_km") is not None:
@@ -144,16 +188,7 @@ def get_transport_options(origin_lat: float, origin_lon: float, dest_lat: float,
         driving_hours = float(route.get("duration_hours", max(0.1, distance_km / 50.0)))
     else:
         # Fallback: compute great-circle distance (Haversine)
-        def _haversine_km(lat1, lon1, lat2, lon2):
-            R = 6371.0
-            from math import radians, sin, cos, sqrt, atan2
-            dlat = radians(lat2 - lat1)
-            dlon = radians(lon2 - lon1)
-            a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-            c = 2 * atan2(sqrt(a), sqrt(1-a))
-            return R * c
-
-        distance_km = round(_haversine_km(origin_lat, origin_lon, dest_lat, dest_lon), 2)
+        distance_km = round(float(haversine_km(origin_lat, origin_lon, [dest_lat], [dest_lon])[0]), 2)
         driving_hours = round(distance_km / 60.0, 2)  # assume faster highways
 
     # 2) Build options with sensible thresholds
@@ -217,3 +252,182 @@ def get_transport_options(origin_lat: float, origin_lon: float, dest_lat: float,
         "options": options,
         "raw_route": route if route.get("status") != "ok" else None
     }
+
+
+# -----------------------------
+# One-to-many (ORS matrix)
+# -----------------------------
+def _no_route(profile: str, error: str) -> Dict[str, Any]:
+    return {
+        "status": "no_route",
+        "provider": "openrouteservice",
+        "mode": profile,
+        "error": error,
+    }
+
+
+async def get_route_matrix(origin_lat: float, origin_lon: float, destinations: Sequence[Tuple[float, float]], profile: str = "driving-car") -> List[Dict[str, Any]]:
+    """
+    Driving summaries from one origin to many (lat, lon) destinations.
+
+    Uses the route cache first and one ORS /v2/matrix request per
+    ORS_MATRIX_MAX_DESTINATIONS uncached destinations (sent concurrently),
+    instead of one directions call each. Returns get_route-shaped dicts aligned with
+    `destinations`; fresh results are written back to the route cache.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(destinations)
+    pending = []
+
+    for i, (lat, lon) in enumerate(destinations):
+        cached = await _route_cache.aget(route_cache_key(origin_lat, origin_lon, lat, lon, profile))
+        if cached is not MISSING:
+            results[i] = dict(cached)
+        else:
+            pending.append(i)
+
+    if pending and not settings.ors_api_key:
+        for i in pending:
+            results[i] = _no_route(profile, "ors_api_key missing")
+        return results
+
+    headers = {
+        "Authorization": settings.ors_api_key,
+        "Content-Type": "application/json"
+    }
+    step = max(1, settings.ORS_MATRIX_MAX_DESTINATIONS)
+
+    async def fetch_chunk(chunk):
+        body = {
+            "locations": [[origin_lon, origin_lat]] + [
+                [destinations[i][1], destinations[i][0]] for i in chunk
+            ],
+            "sources": [0],
+            "destinations": list(range(1, len(chunk) + 1)),
+            "metrics": ["distance", "duration"],
+            "units": "km"
+        }
+
+        try:
+            resp = await upstream.request("ors", "POST", f"{ORS_MATRIX_URL_BASE}/{profile}", json=body, headers=headers)
+            resp.raise_for_status()
+            data = resp.json()
+        except (httpx.HTTPError, ValueError) as e:
+            for i in chunk:
+                results[i] = _no_route(profile, str(e))
+            return
+
+        distances = (data.get("distances") or [[]])[0]
+        durations = (data.get("durations") or [[]])[0]
+
+        for j, i in enumerate(chunk):
+            distance = distances[j] if j < len(distances) else None
+            duration = durations[j] if j < len(durations) else None
+            if distance is None or duration is None:
+                results[i] = _no_route(profile, "no route in matrix")
+                continue
+
+            route = {
+                "status": "ok",
+                "provider": "openrouteservice",
+                "mode": profile,
+                "distance_km": round(distance, 2),
+                "duration_min": round(duration / 60.0, 2),
+                "duration_hours": round(duration / 3600.0, 2),
+                "raw_summary": {"distance": distance * 1000.0, "duration": duration},
+            }
+            lat, lon = destinations[i]
+            await _route_cache.aset(route_cache_key(origin_lat, origin_lon, lat, lon, profile), route)
+            results[i] = dict(route)
+
+    # chunks are independent: fetch them concurrently
+    await asyncio.gather(*(
+        fetch_chunk(pending[start:start + step])
+        for start in range(0, len(pending), step)
+    ))
+
+    return results
+
+
+async def get_transport_options_many(origin_lat: float, origin_lon: float, destinations: Sequence[Tuple[float, float]], days: Optional[int] = None, budget: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    get_transport_options for one origin and N (lat, lon) destinations.
+
+    Routes come from one matrix request (see get_route_matrix); distances,
+    costs, per-mode durations and the recommended mode are then computed
+    for all pairs at once with NumPy, using the same rules as
+    get_transport_options. Returns a list aligned with `destinations`.
+    """
+    if not destinations:
+        return []
+
+    routes = await get_route_matrix(origin_lat, origin_lon, destinations, profile="driving-car")
+    ok = np.array([r.get("status") == "ok" and r.get("distance_km") is not None for r in routes])
+
+    # 1) Distances: ORS where available, great-circle fallback elsewhere
+    great_circle = np.round(haversine_km(
+        origin_lat,
+        origin_lon,
+        [d[0] for d in destinations],
+        [d[1] for d in destinations]
+    ), 2)
+    ors_km = np.array([float(r["distance_km"]) if o else 0.0 for r, o in zip(routes, ok)])
+    ors_hours = np.array([
+        float(r.get("duration_hours", max(0.1, r["distance_km"] / 50.0))) if o else 0.0
+        for r, o in zip(routes, ok)
+    ])
+
+    distance_km = np.where(ok, ors_km, great_circle)
+    driving_hours = np.where(ok, ors_hours, np.round(great_circle / 60.0, 2))
+
+    # 2) Costs (same rates and budget tuning as _cost_estimates)
+    level = _budget_level(budget)
+    flight_factor = 1.2 if level == "low" else 0.9 if level == "high" else 1.0
+
+    cost = np.stack([
+        np.floor(distance_km * COST_RATES["car"]),
+        np.floor(distance_km * COST_RATES["train"]),
+        np.floor(np.floor(distance_km * COST_RATES["flight"]) * flight_factor),
+    ])
+
+    # 3) Durations and availability per mode: car | train | flight
+    hours = np.stack([
+        np.round(driving_hours, 2),
+        np.round(distance_km / 50.0, 2),
+        np.round(1.0 + distance_km / 800.0, 2),
+    ])
+    available = np.stack([
+        np.ones_like(distance_km, dtype=bool),
+        distance_km >= 50,
+        distance_km >= 300,
+    ])
+
+    # 4) Recommended = lowest 0.7 * duration + 0.3 * cost/km
+    #    (argmin keeps the first mode on ties, like the stable sort)
+    score = hours * 0.7 + (cost / np.maximum(1.0, distance_km)) * 0.3
+    recommended = np.argmin(np.where(available, score, np.inf), axis=0)
+
+    modes = ("car", "train", "flight")
+    reasons = (
+        "Door-to-door flexibility; best for short-to-medium distances",
+        "Affordable and comfortable for medium/long distances",
+        "Fastest for long distances (includes approximate ticket cost)",
+    )
+
+    results = []
+    for j, route in enumerate(routes):
+        results.append({
+            "distance_km": round(float(distance_km[j]), 2),
+            "recommended": modes[recommended[j]],
+            "options": [
+                {
+                    "mode": modes[m],
+                    "duration_hours": float(hours[m, j]),
+                    "estimated_cost": int(cost[m, j]),
+                    "reason": reasons[m]
+                }
+                for m in range(3) if available[m, j]
+            ],
+            "raw_route": None if ok[j] else route
+        })
+
+    return results
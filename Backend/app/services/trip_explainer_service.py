@@ -1,25 +1,61 @@
 from datetime import datetime
+import asyncio
 import json
-from app.database import trip_explanations_collection
+from typing import Optional, Dict, Any
+from pymongo.errors import PyMongoError
+from app.config import settings
+from app.database_async import trip_explanations_collection, smart_destinations_collection
 from app.services.groq_ai import generate_recommendations
+from app.services.personality_engine import PERSONALITY_TYPES
+from app.utils.cache import TTLCache, MISSING
 
+# (destination, personality) -> explanation, in front of the
+# trip_explanations collection (filled in bulk by precompute_explanations)
+_explanation_cache = TTLCache(
+    maxsize=settings.EXPLANATION_CACHE_SIZE,
+    ttl=settings.EXPLANATION_CACHE_TTL
+)
+_indexes_ready = False
 
-def generate_trip_explanation(destination: str, personality: str):
 
-    # 1️⃣ Check Cache
-    existing = trip_explanations_collection.find_one({
-        "destination_name": destination,
-        "personality_type": personality
-    })
+async def _ensure_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    # tried once per process: duplicate rows from before the upsert make
+    # the unique index fail until precompute_explanations removes them
+    _indexes_ready = True
+    try:
+        await trip_explanations_collection.create_index(
+            [("destination_name", 1), ("personality_type", 1)],
+            unique=True
+        )
+    except PyMongoError as e:
+        print("Trip explanation index error:", e)
+
+
+async def _dedupe_explanations() -> int:
+    """
+    Keep only the oldest row per (destination, personality); older
+    versions of the route inserted one per request.
+    """
+    cursor = await trip_explanations_collection.aggregate([
+        {"$sort": {"_id": 1}},
+        {"$group": {
+            "_id": {"destination": "$destination_name", "personality": "$personality_type"},
+            "ids": {"$push": "$_id"}
+        }},
+        {"$match": {"ids.1": {"$exists": True}}}
+    ])
+    extra = [i async for group in cursor for i in group["ids"][1:]]
+    if extra:
+        await trip_explanations_collection.delete_many({"_id": {"$in": extra}})
+        print(f"Explanations: removed {len(extra)} duplicate rows")
+    return len(extra)
 
-    if existing:
-        return {
-            "cached": True,
-            "explanation": existing["explanation"]
-        }
 
-    # 2️⃣ Build Prompt
-    prompt = f"""
+def _explanation_prompt(destination: str, personality: str) -> str:
+    return f"""
 You are a premium travel consultant.
 
 User personality type: {personality}
@@ -45,27 +81,130 @@ No markdown.
 Only JSON.
 """
 
-    ai_text = generate_recommendations(prompt)
+
+async def _request_explanation(destination: str, personality: str) -> Optional[Dict[str, Any]]:
+    ai_text = await generate_recommendations(_explanation_prompt(destination, personality))
 
     try:
-        parsed = json.loads(ai_text)
-    except:
+        return json.loads(ai_text)
+    except ValueError:
         start = ai_text.find("{")
         end = ai_text.rfind("}")
         if start != -1 and end != -1:
-            parsed = json.loads(ai_text[start:end+1])
-        else:
-            return {"error": "AI parsing failed"}
+            try:
+                return json.loads(ai_text[start:end+1])
+            except ValueError:
+                pass
+        return None
 
-    # 3️⃣ Store In DB
-    trip_explanations_collection.insert_one({
+
+async def _store_explanation(destination: str, personality: str, explanation: Dict[str, Any]):
+    # upsert so concurrent requests / the precompute job never duplicate a pair
+    await trip_explanations_collection.update_one(
+        {"destination_name": destination, "personality_type": personality},
+        {"$setOnInsert": {
+            "destination_name": destination,
+            "personality_type": personality,
+            "generated_at": datetime.utcnow(),
+            "explanation": explanation
+        }},
+        upsert=True
+    )
+
+
+async def generate_trip_explanation(destination: str, personality: str):
+
+    # 1️⃣ Check Cache (memory, then Mongo)
+    key = (destination, personality)
+    cached = _explanation_cache.get(key)
+    if cached is not MISSING:
+        return {
+            "cached": True,
+            "explanation": cached
+        }
+
+    await _ensure_indexes()
+    existing = await trip_explanations_collection.find_one({
         "destination_name": destination,
-        "personality_type": personality,
-        "generated_at": datetime.utcnow(),
-        "explanation": parsed
+        "personality_type": personality
     })
 
+    if existing:
+        _explanation_cache.set(key, existing["explanation"])
+        return {
+            "cached": True,
+            "explanation": existing["explanation"]
+        }
+
+    # 2️⃣ Ask the model
+    parsed = await _request_explanation(destination, personality)
+    if parsed is None:
+        return {"error": "AI parsing failed"}
+
+    # 3️⃣ Store In DB
+    await _store_explanation(destination, personality, parsed)
+    _explanation_cache.set(key, parsed)
+
     return {
         "cached": False,
         "explanation": parsed
-    }
\ No newline at end of file
+    }
+
+
+async def precompute_explanations(concurrency: int = None, limit: int = None) -> Dict[str, int]:
+    """
+    Generate the missing explanations for every catalog destination x
+    every personality type, at most `concurrency` LLM calls at a time.
+
+    Each pair is stored as soon as it is generated and pairs already in
+    the collection are skipped, so an interrupted run resumes where it
+    stopped. Returns {"total", "existing", "generated", "failed"}.
+    """
+    global _indexes_ready
+    concurrency = concurrency or settings.EXPLANATION_PRECOMPUTE_CONCURRENCY
+
+    try:
+        await _dedupe_explanations()
+    except PyMongoError as e:
+        print("Explanation dedupe error:", e)
+    # retry the unique index, the duplicates that broke it are gone
+    _indexes_ready = False
+    await _ensure_indexes()
+
+    names = await smart_destinations_collection.distinct("name")
+    done = {
+        (d["destination_name"], d["personality_type"])
+        async for d in trip_explanations_collection.find(
+            {}, {"_id": 0, "destination_name": 1, "personality_type": 1}
+        )
+    }
+
+    pairs = [(n, p) for n in sorted(names) for p in PERSONALITY_TYPES]
+    missing = [pair for pair in pairs if pair not in done]
+    stats = {"total": len(pairs), "existing": len(pairs) - len(missing), "generated": 0, "failed": 0}
+    if limit is not None:
+        missing = missing[:limit]
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(destination: str, personality: str):
+        async with slots:
+            try:
+                parsed = await _request_explanation(destination, personality)
+                if parsed is None:
+                    stats["failed"] += 1
+                    return
+                await _store_explanation(destination, personality, parsed)
+                _explanation_cache.set((destination, personality), parsed)
+                stats["generated"] += 1
+            except Exception as e:
+                print("Explanation precompute error:", destination, personality, e)
+                stats["failed"] += 1
+                return
+
+            finished = stats["generated"] + stats["failed"]
+            if finished % 10 == 0:
+                print(f"Explanations: {finished}/{len(missing)} processed")
+
+    await asyncio.gather(*(run(n, p) for n, p in missing))
+    return stats
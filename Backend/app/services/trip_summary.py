@@ -1,8 +1,12 @@
 # app/services/trip_summary.py
+import asyncio
+import hashlib
+import json
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
-from app.database import trips_collection
+from app.config import settings
+from app.database_async import trips_collection
 from app.services.transport import get_transport_options
 from app.services.hotels import search_hotels
 from app.services.geocode import geocode_city
@@ -15,78 +19,263 @@ TRANSPORT_BOOKING_LINKS = {
     "car": "https://www.google.com/maps"
 }
 
+# Trip fields each upstream-backed section depends on. A section stored
+# under a different hash is recomputed before it is served; one that is
+# only older than its TTL (SUMMARY_EMPTY_TTL when the upstream had
+# nothing) is served and refreshed in the background.
+SECTION_FIELDS = {
+    "transport": ("source", "destination", "days", "budget"),
+    "hotels": ("destination", "days", "people"),
+}
+
+# (trip id, section) refreshes currently running, and their tasks
+_refreshing = set()
+_tasks = set()
+
+
+def _hash(values) -> str:
+    raw = json.dumps(values, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def section_version(trip: Dict[str, Any], section: str) -> str:
+    return _hash([trip.get(f) for f in SECTION_FIELDS[section]])
+
+
+def summary_version(trip: Dict[str, Any]) -> str:
+    """
+    Hash of every trip field the summary depends on.
+    """
+    plan = trip.get("plan") or {}
+    return _hash([
+        [section_version(trip, s) for s in sorted(SECTION_FIELDS)],
+        plan.get("itinerary"),
+        plan.get("estimated_cost"),
+        plan.get("confidence")
+    ])
+
+
+def _section_ttl(section: str, meta: Dict[str, Any]) -> int:
+    if meta.get("empty"):
+        return settings.SUMMARY_EMPTY_TTL
+    if section == "transport":
+        return settings.SUMMARY_TRANSPORT_TTL
+    return settings.SUMMARY_HOTELS_TTL
 
-def generate_trip_summary(trip: Dict[str, Any]) -> Dict[str, Any]:
-    source = trip.get("source")
-    destination = trip.get("destination")
-    days = trip.get("days", 1)
-    people = trip.get("people", 1)
-    budget = trip.get("budget")
-
-    # 1️⃣ Geocode
-    origin = geocode_city(source)
-    dest = geocode_city(destination)
-
-    transport_data = None
-    if origin and dest:
-        transport_data = get_transport_options(
-            origin["lat"],
-            origin["lon"],
-            dest["lat"],
-            dest["lon"],
-            days=days,
-            budget=budget
-        )
 
+# -----------------------------
+# Sections (upstream calls)
+# -----------------------------
+async def _fetch_transport(trip: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    origin, dest = await asyncio.gather(
+        geocode_city(trip.get("source")),
+        geocode_city(trip.get("destination"))
+    )
+    if not (origin and dest):
+        return None
+
+    transport_data = await get_transport_options(
+        origin["lat"],
+        origin["lon"],
+        dest["lat"],
+        dest["lon"],
+        days=trip.get("days", 1),
+        budget=trip.get("budget")
+    )
+
+    if transport_data:
         # attach booking links
         for opt in transport_data.get("options", []):
             opt["booking_link"] = TRANSPORT_BOOKING_LINKS.get(
                 opt["mode"], "https://www.google.com"
             )
 
-    # 2️⃣ Hotels (basic date logic)
+    return transport_data
+
+
+async def _fetch_hotels(trip: Dict[str, Any]) -> List[Dict[str, Any]]:
     today = datetime.utcnow().date()
     checkin = today.isoformat()
-    checkout = (today + timedelta(days=max(1, days))).isoformat()
+    checkout = (today + timedelta(days=max(1, trip.get("days", 1)))).isoformat()
 
-    hotels = []
     try:
-        hotels = search_hotels(
-            city=destination,
+        hotels = await search_hotels(
+            city=trip.get("destination"),
             checkin=checkin,
             checkout=checkout,
-            adults=people
+            adults=trip.get("people", 1)
         )
     except Exception:
-        hotels = []
+        return []
 
     # normalize hotel booking links
     for h in hotels:
         if not h.get("booking_url"):
             h["booking_url"] = "https://www.booking.com"
 
-    # 3️⃣ Cost estimation
-    estimated_cost = trip.get("plan", {}).get("estimated_cost")
-    if not estimated_cost and transport_data:
+    return hotels[:5]
+
+
+SECTION_FETCHERS = {
+    "transport": _fetch_transport,
+    "hotels": _fetch_hotels,
+}
+
+
+async def _fetch_section(trip: Dict[str, Any], section: str) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Returns (data, meta). Empty results (nothing found or the upstream
+    failed) are marked so they are retried after SUMMARY_EMPTY_TTL.
+    """
+    data = await SECTION_FETCHERS[section](trip)
+    meta = {
+        "version": section_version(trip, section),
+        "refreshed_at": datetime.utcnow(),
+        "empty": not data
+    }
+    return data, meta
+
+
+# -----------------------------
+# Assembly
+# -----------------------------
+def _assemble(trip: Dict[str, Any], transport_data, hotels, sections: Dict[str, Any]) -> Dict[str, Any]:
+    days = trip.get("days", 1)
+    plan = trip.get("plan") or {}
+
+    # Cost estimation
+    estimated_cost = plan.get("estimated_cost")
+    if not estimated_cost and transport_data and transport_data.get("options"):
         cheapest = min(
             transport_data["options"],
             key=lambda o: o.get("estimated_cost", 999999)
         )
         estimated_cost = cheapest.get("estimated_cost", 0) + (days * 1200)
 
-    summary = {
+    return {
         "route": {
-    "source": source,
-    "destination": destination,
-    "distance_km": transport_data.get("distance_km") if transport_data else None
-}
-,
+            "source": trip.get("source"),
+            "destination": trip.get("destination"),
+            "distance_km": transport_data.get("distance_km") if transport_data else None
+        },
         "transport": transport_data,
-        "hotels": hotels[:5],
-        "itinerary": trip.get("plan", {}).get("itinerary"),
+        "hotels": hotels or [],
+        "itinerary": plan.get("itinerary"),
         "estimated_total_cost": int(estimated_cost or 0),
-        "confidence": trip.get("plan", {}).get("confidence", 0.6),
+        "confidence": plan.get("confidence", 0.6),
+        "version": summary_version(trip),
+        "sections": sections,
         "generated_at": datetime.utcnow()
     }
 
-    return summary
+
+async def generate_trip_summary(trip: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the whole summary from upstream (transport and hotels at once).
+    """
+    (transport_data, transport_meta), (hotels, hotels_meta) = await asyncio.gather(
+        _fetch_section(trip, "transport"),
+        _fetch_section(trip, "hotels")
+    )
+    return _assemble(trip, transport_data, hotels, {"transport": transport_meta, "hotels": hotels_meta})
+
+
+def _is_fresh(meta: Dict[str, Any], section: str, now: datetime) -> bool:
+    refreshed_at = meta.get("refreshed_at")
+    return bool(refreshed_at) and (now - refreshed_at).total_seconds() < _section_ttl(section, meta)
+
+
+async def get_trip_summary(trip: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Summary for `trip`, reusing its stored `summary` where possible.
+
+    Sections whose version no longer matches the trip are fetched before
+    returning; sections past their TTL are served as stored and refreshed
+    in the background. Returns (summary, update) where `update` holds the
+    `$set` fields the caller should store (empty when nothing changed):
+    the rebuilt top-level fields and only the refetched sections, so a
+    concurrent background refresh of another section is not overwritten.
+    """
+    stored = trip.get("summary") or {}
+    stored_sections = stored.get("sections") or {}
+    now = datetime.utcnow()
+
+    data = {}
+    sections = {}
+    invalid = []
+    stale = []
+
+    for section in SECTION_FIELDS:
+        meta = stored_sections.get(section)
+        if not meta or meta.get("version") != section_version(trip, section):
+            invalid.append(section)
+            continue
+        data[section] = stored.get(section)
+        sections[section] = meta
+        if not _is_fresh(meta, section, now):
+            stale.append(section)
+
+    if invalid:
+        fetched = await asyncio.gather(*(_fetch_section(trip, s) for s in invalid))
+        for section, (value, meta) in zip(invalid, fetched):
+            data[section] = value
+            sections[section] = meta
+
+    for section in stale:
+        schedule_section_refresh(trip, section)
+
+    summary = _assemble(trip, data.get("transport"), data.get("hotels"), sections)
+    update = {}
+    if invalid or stored.get("version") != summary["version"]:
+        update = {
+            f"summary.{k}": v for k, v in summary.items()
+            if k != "sections" and k not in SECTION_FIELDS
+        }
+        for section in invalid:
+            update[f"summary.{section}"] = summary[section]
+            update[f"summary.sections.{section}"] = sections[section]
+    else:
+        summary["generated_at"] = stored.get("generated_at", summary["generated_at"])
+    summary["refreshing"] = stale
+    return summary, update
+
+
+# -----------------------------
+# Background refresh
+# -----------------------------
+async def _refresh_section(trip: Dict[str, Any], section: str):
+    try:
+        value, meta = await _fetch_section(trip, section)
+        if value:
+            update = {
+                f"summary.{section}": value,
+                f"summary.sections.{section}": meta
+            }
+        else:
+            # keep serving what is stored, try again after SUMMARY_EMPTY_TTL
+            update = {
+                f"summary.sections.{section}.refreshed_at": meta["refreshed_at"],
+                f"summary.sections.{section}.empty": True
+            }
+
+        # only if the trip still has the inputs this section was built from
+        await trips_collection.update_one(
+            {"_id": trip["_id"], f"summary.sections.{section}.version": meta["version"]},
+            {"$set": update}
+        )
+    except Exception as e:
+        print("Summary refresh error:", section, e)
+    finally:
+        _refreshing.discard((trip["_id"], section))
+
+
+def schedule_section_refresh(trip: Dict[str, Any], section: str):
+    key = (trip["_id"], section)
+    if key in _refreshing:
+        return
+    _refreshing.add(key)
+    task = asyncio.create_task(_refresh_section(trip, section))
+    # keep a reference until done, the loop only holds weak ones
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
@@ -0,0 +1,218 @@
+# app/services/weather.py
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Union
+
+import httpx
+import numpy as np
+
+from app.config import settings
+from app.core import upstream
+from app.database import weather_cache_collection
+from app.services.geocode import geocode_city
+from app.utils.cache import PersistentTTLCache, SingleFlight, MISSING
+
+FORECAST_URL = "https://api.openweathermap.org/data/2.5/forecast"
+
+# OpenWeather's 5 day / 3 hour forecast is recomputed every 3 hours
+UPDATE_INTERVAL = 3 * 60 * 60
+DAY = 24 * 60 * 60
+EPOCH = date(1970, 1, 1)
+
+# Columnar 40-slot series per snapped location, expiring at the next
+# 3-hour boundary (UTC)
+_forecast_cache = PersistentTTLCache(
+    weather_cache_collection,
+    maxsize=settings.WEATHER_CACHE_SIZE,
+    ttl=UPDATE_INTERVAL,
+    name="Weather cache"
+)
+_forecast_flight = SingleFlight()
+
+# at most WEATHER_MAX_CONCURRENCY OpenWeather calls at once, process-wide
+_provider_slots: asyncio.Semaphore = None
+
+
+class WeatherError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def seconds_until_update(now: float = None) -> float:
+    now = time.time() if now is None else now
+    return max(1.0, UPDATE_INTERVAL - now % UPDATE_INTERVAL)
+
+
+def snap(lat: float, lon: float):
+    """
+    Snap to a WEATHER_SNAP_DEG grid: (cache key, cell lat, cell lon).
+    """
+    step = settings.WEATHER_SNAP_DEG
+    cell_lat, cell_lon = round(lat / step), round(lon / step)
+    return f"{cell_lat}:{cell_lon}", round(cell_lat * step, 4), round(cell_lon * step, 4)
+
+
+def _series(data: Dict[str, Any]) -> Dict[str, Any]:
+    items = sorted(data.get("list") or [], key=lambda i: i["dt"])
+    city = data.get("city") or {}
+    return {
+        "name": city.get("name"),
+        "timezone": int(city.get("timezone") or 0),
+        "dt": [i["dt"] for i in items],
+        "temp": [i["main"]["temp"] for i in items],
+        "temp_min": [i["main"].get("temp_min", i["main"]["temp"]) for i in items],
+        "temp_max": [i["main"].get("temp_max", i["main"]["temp"]) for i in items],
+        "condition": [i["weather"][0]["description"] for i in items],
+        "icon": [i["weather"][0]["icon"] for i in items],
+    }
+
+
+async def _fetch_series(key: str, lat: float, lon: float) -> Dict[str, Any]:
+    global _provider_slots
+    if _provider_slots is None:
+        _provider_slots = asyncio.Semaphore(settings.WEATHER_MAX_CONCURRENCY)
+
+    params = {
+        "lat": lat,
+        "lon": lon,
+        "appid": settings.openweather_api_key,
+        "units": "metric"
+    }
+
+    try:
+        async with _provider_slots:
+            res = await upstream.request("openweather", "GET", FORECAST_URL, params=params)
+        data = res.json()
+    except (httpx.HTTPError, ValueError):
+        raise WeatherError(502, "Weather service unavailable")
+
+    if res.status_code != 200:
+        raise WeatherError(400, data.get("message") or "Weather service error")
+
+    series = _series(data)
+    await _forecast_cache.aset(key, series, ttl=seconds_until_update())
+    return series
+
+
+async def get_forecast_series(lat: float, lon: float) -> Dict[str, Any]:
+    """
+    5 day / 3 hour series for the grid cell around (lat, lon), from the
+    cache when the current 3-hour window has been fetched already.
+    """
+    if not settings.openweather_api_key:
+        raise WeatherError(500, "Weather API key missing")
+
+    key, cell_lat, cell_lon = snap(lat, lon)
+
+    cached = await _forecast_cache.aget(key)
+    if cached is not MISSING:
+        return cached
+
+    return await _forecast_flight.run(key, lambda: _fetch_series(key, cell_lat, cell_lon))
+
+
+def daily_forecast(series: Dict[str, Any], start: date, end: date) -> List[Dict[str, Any]]:
+    """
+    Per local day between `start` and `end`: min / max over all slots, plus
+    the temperature and condition of the slot closest to local noon.
+    """
+    dt = np.asarray(series["dt"], dtype=np.int64)
+    if not dt.size:
+        return []
+
+    local = dt + series.get("timezone", 0)
+    day = local // DAY
+
+    idx = np.flatnonzero((day >= (start - EPOCH).days) & (day <= (end - EPOCH).days))
+    if not idx.size:
+        return []
+
+    days = day[idx]
+    # slots are chronological, so each day is one contiguous run
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+
+    temp_min = np.minimum.reduceat(np.asarray(series["temp_min"], dtype=np.float64)[idx], starts)
+    temp_max = np.maximum.reduceat(np.asarray(series["temp_max"], dtype=np.float64)[idx], starts)
+
+    from_noon = np.abs(local[idx] % DAY - DAY // 2)
+    midday = idx[np.lexsort((from_noon, days))[starts]]
+
+    return [
+        {
+            "date": (EPOCH + timedelta(days=int(d))).isoformat(),
+            "temp": series["temp"][m],
+            "temp_min": float(lo),
+            "temp_max": float(hi),
+            "condition": series["condition"][m],
+            "icon": series["icon"][m]
+        }
+        for d, m, lo, hi in zip(days[starts], midday, temp_min, temp_max)
+    ]
+
+
+async def forecast_for_city(city: str, start: date, end: date) -> List[Dict[str, Any]]:
+    coords = await geocode_city(city)
+    if not coords:
+        raise WeatherError(400, "city not found")
+
+    series = await get_forecast_series(coords["lat"], coords["lon"])
+    return daily_forecast(series, start, end)
+
+
+async def forecast_many(destinations: List[Union[str, Dict[str, Any]]], start: date, end: date) -> List[Dict[str, Any]]:
+    """
+    Daily forecasts for many destinations (city names or {name, lat, lon})
+    in one go. Destinations in the same grid cell share one series; the
+    missing series are fetched concurrently under the provider cap.
+    One result per destination, in order, with an "error" instead of
+    "days" when it could not be served.
+    """
+    if not settings.openweather_api_key:
+        raise WeatherError(500, "Weather API key missing")
+
+    async def locate(dest):
+        if isinstance(dest, str):
+            return dest, await geocode_city(dest)
+        if dest.get("lat") is not None and dest.get("lon") is not None:
+            return dest["name"], {"lat": dest["lat"], "lon": dest["lon"]}
+        return dest["name"], await geocode_city(dest["name"])
+
+    located = await asyncio.gather(*(locate(d) for d in destinations))
+
+    cells = {}
+    for _, coords in located:
+        if coords:
+            key, _, _ = snap(coords["lat"], coords["lon"])
+            cells.setdefault(key, coords)
+
+    keys = list(cells)
+    fetched = await asyncio.gather(
+        *(get_forecast_series(cells[k]["lat"], cells[k]["lon"]) for k in keys),
+        return_exceptions=True
+    )
+    series_by_key = dict(zip(keys, fetched))
+
+    results = []
+    for name, coords in located:
+        if not coords:
+            results.append({"name": name, "error": "city not found"})
+            continue
+
+        series = series_by_key[snap(coords["lat"], coords["lon"])[0]]
+        if isinstance(series, WeatherError):
+            results.append({"name": name, "error": series.detail})
+        elif isinstance(series, Exception):
+            print("Weather batch error:", name, series)
+            results.append({"name": name, "error": "Weather service unavailable"})
+        else:
+            results.append({
+                "name": name,
+                "lat": coords["lat"],
+                "lon": coords["lon"],
+                "days": daily_forecast(series, start, end)
+            })
+
+    return results
@@ -0,0 +1,172 @@
+# app/utils/cache.py
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Hashable, Optional
+
+from pymongo.errors import PyMongoError
+
+# Sentinel returned on a miss so callers can tell "not cached" apart from a
+# cached ``None`` (negative cache entry).
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache with per-entry expiry.
+
+    Used as the in-process tier in front of the Mongo-backed caches. Entries
+    are evicted least-recently-used first once ``maxsize`` is reached, and are
+    dropped lazily on read once their TTL has passed.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class PersistentTTLCache:
+    """
+    Two-tier cache: a TTLCache in front of a Mongo collection.
+
+    Documents look like {"key", "value", "cached_at", "expires_at"}; a TTL
+    index on ``expires_at`` lets Mongo drop stale entries by itself. Mongo
+    errors are logged and treated as misses so the cache never breaks the
+    caller.
+    """
+
+    def __init__(self, collection, maxsize: int = 1024, ttl: float = 3600, name: str = "cache"):
+        self.collection = collection
+        self.ttl = ttl
+        self.name = name
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._indexes_ready = False
+        self._indexes_lock = threading.Lock()
+
+    def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        with self._indexes_lock:
+            if self._indexes_ready:
+                return
+            try:
+                self.collection.create_index("key", unique=True)
+                self.collection.create_index("expires_at", expireAfterSeconds=0)
+                self._indexes_ready = True
+            except PyMongoError as e:
+                print(f"{self.name} index error:", e)
+
+    def get(self, key: str) -> Any:
+        value = self.memory.get(key)
+        if value is not MISSING:
+            return value
+
+        self._ensure_indexes()
+        try:
+            doc = self.collection.find_one({"key": key})
+        except PyMongoError as e:
+            print(f"{self.name} read error:", e)
+            return MISSING
+
+        if not doc:
+            return MISSING
+
+        remaining = (doc.get("expires_at", datetime.min) - datetime.utcnow()).total_seconds()
+        if remaining <= 0:
+            return MISSING
+
+        self.memory.set(key, doc.get("value"), ttl=remaining)
+        return doc.get("value")
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self.memory.set(key, value, ttl=ttl)
+
+        self._ensure_indexes()
+        now = datetime.utcnow()
+        try:
+            self.collection.update_one(
+                {"key": key},
+                {"$set": {
+                    "value": value,
+                    "cached_at": now,
+                    "expires_at": now + timedelta(seconds=ttl)
+                }},
+                upsert=True
+            )
+        except PyMongoError as e:
+            print(f"{self.name} write error:", e)
+
+    async def aget(self, key: str) -> Any:
+        """
+        Async get: memory hits return immediately, the Mongo tier is read
+        in a worker thread so the event loop is never blocked.
+        """
+        value = self.memory.get(key)
+        if value is not MISSING:
+            return value
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+
+class SingleFlight:
+    """
+    Per-key request coalescing: concurrent ``run(key, fn)`` calls for the
+    same key share one in-flight ``fn()`` call and its result (or error).
+
+    The shared call is shielded, so a cancelled caller never cancels it
+    for the others.
+    """
+
+    def __init__(self):
+        self._tasks: "dict[Hashable, asyncio.Future]" = {}
+
+    async def run(self, key: Hashable, fn) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tasks
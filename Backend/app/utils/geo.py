@@ -0,0 +1,37 @@
+# app/utils/geo.py
+from typing import Optional, Sequence
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat: float, lon: float, lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+    """
+    Great-circle distance (km) from one point to many, in a single
+    vectorized pass. Returns a float64 array aligned with `lats`/`lons`.
+    """
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def top_k(values: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """
+    Indices of the `k` smallest values, in ascending order.
+    Uses argpartition so only the selected slice is fully sorted;
+    `k=None` sorts everything.
+    """
+    n = len(values)
+    if k is None or k >= n:
+        return np.argsort(values, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    idx = np.argpartition(values, k - 1)[:k]
+    # ties keep input order, matching a stable full sort
+    return idx[np.lexsort((idx, values[idx]))]
@@ -0,0 +1,120 @@
+# app/utils/geohash.py
+import math
+from typing import List, Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """
+    (lat_degrees, lon_degrees) covered by one cell at `precision` chars.
+    """
+    bits = precision * 5
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def encode(lat: float, lon: float, precision: int = 5) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bit, ch, even = 0, 0, True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                ch = (ch << 1) | 1
+                lon_lo = mid
+            else:
+                ch <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+
+    return "".join(chars)
+
+
+def bbox(geohash: str) -> Tuple[float, float, float, float]:
+    """
+    (south, west, north, east) of a geohash cell.
+    """
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+
+    for c in geohash:
+        value = _DECODE[c]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                if bit:
+                    lon_lo = mid
+                else:
+                    lon_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+
+    return lat_lo, lon_lo, lat_hi, lon_hi
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def cover_circle(lat: float, lon: float, radius_km: float, precision: int = 5) -> List[str]:
+    """
+    Geohash cells at `precision` that intersect the circle around (lat, lon).
+    """
+    dlat_deg, dlon_deg = cell_size(precision)
+    r_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    r_lon = r_lat / max(0.01, math.cos(math.radians(lat)))
+
+    south, north = max(-90.0, lat - r_lat), min(90.0, lat + r_lat)
+    west, east = lon - r_lon, lon + r_lon
+
+    cells = []
+    row = math.floor((south + 90.0) / dlat_deg)
+    while -90.0 + row * dlat_deg < north:
+        cell_s = -90.0 + row * dlat_deg
+        col = math.floor((west + 180.0) / dlon_deg)
+        while -180.0 + col * dlon_deg < east:
+            cell_w = -180.0 + col * dlon_deg
+            # nearest point of the cell to the centre
+            near_lat = min(max(lat, cell_s), cell_s + dlat_deg)
+            near_lon = min(max(lon, cell_w), cell_w + dlon_deg)
+            if _haversine_km(lat, lon, near_lat, near_lon) <= radius_km:
+                wrapped = (cell_w + dlon_deg / 2 + 180.0) % 360.0 - 180.0
+                cells.append(encode(cell_s + dlat_deg / 2, wrapped, precision))
+            col += 1
+        row += 1
+
+    return sorted(set(cells))
@@ -0,0 +1,104 @@
+# app/utils/json_stream.py
+import codecs
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class ArrayItemParser:
+    """
+    Incremental parser for the items of the top-level array `key` in a
+    JSON object that arrives in byte chunks, e.g. Overpass'
+    {"elements": [...]}.
+
+    Only the item currently being decoded is buffered, so memory stays
+    flat no matter how long the array is. Anything after the array is
+    ignored.
+    """
+
+    def __init__(self, key: str):
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._marker = json.dumps(key)
+        self._buf = ""
+        self._in_array = False
+        self.done = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """
+        Add a chunk; returns the items completed by it.
+        """
+        if self.done:
+            return []
+
+        self._buf += self._utf8.decode(chunk)
+        marker = self._marker
+
+        while not self._in_array:
+            buf = self._buf
+            start = buf.find(marker)
+            if start == -1:
+                self._buf = buf[-len(marker):]
+                return []
+
+            # the marker must be an object key: "key" <ws> : <ws> [
+            rest = buf[start + len(marker):].lstrip(_WHITESPACE)
+            if not rest or (rest[0] == ":" and not rest[1:].lstrip(_WHITESPACE)):
+                self._buf = buf[start:]
+                return []
+            if rest[0] == ":" and rest[1:].lstrip(_WHITESPACE)[0] == "[":
+                self._buf = rest[1:].lstrip(_WHITESPACE)[1:]
+                self._in_array = True
+            else:
+                self._buf = buf[start + len(marker):]
+
+        items = []
+        buf = self._buf
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE + ",":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if buf[pos] == "]":
+                self.done = True
+                break
+            try:
+                item, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # incomplete item, wait for more data
+            # a number cut by the chunk boundary ("12" of "12345", "6." of
+            # "6.5") still decodes: only take scalars once `,`, `]` or
+            # whitespace follows them
+            if not isinstance(item, (dict, list, str)) and (end >= len(buf) or buf[end] not in _WHITESPACE + ",]"):
+                break
+            items.append(item)
+            pos = end
+
+        self._buf = buf[pos:]
+        return items
+
+
+def iter_array_items(chunks: Iterable[bytes], key: str) -> Iterator[Any]:
+    """
+    Incrementally yield the items of the top-level array `key` from a JSON
+    object arriving as byte chunks (see ArrayItemParser).
+    """
+    parser = ArrayItemParser(key)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            return
+
+
+async def aiter_array_items(chunks: AsyncIterable[bytes], key: str) -> AsyncIterator[Any]:
+    """
+    Async version of iter_array_items, e.g. for httpx `aiter_bytes()`.
+    """
+    parser = ArrayItemParser(key)
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+        if parser.done:
+            return
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# app.config requires these; tests never reach Mongo or the providers
+os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=200&connectTimeoutMS=200")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("RAZORPAY_KEY_ID", "test")
+os.environ.setdefault("RAZORPAY_KEY_SECRET", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+from app.config import settings
+from app.services import ai_ranking_service as ranking
+
+DESTINATIONS = [
+    {
+        "name": f"Place {i}",
+        "country": "India",
+        "region": "Region",
+        "trip_tags": ["nature", "beach"] if i % 2 else ["nature"],
+        "popularity_score": 5 + i / 10,
+    }
+    for i in range(30)
+]
+
+
+def test_late_llm_answer_serves_next_identical_query(monkeypatch):
+    calls = []
+
+    async def slow_llm(prompt):
+        calls.append(prompt)
+        listed = json.loads(prompt.split("Available destinations:\n")[1].split("\n")[0])
+        await asyncio.sleep(0.2)
+        return json.dumps({"ranked": [{"name": d["name"], "ai_score": 9, "reason": "ok"} for d in listed]})
+
+    monkeypatch.setattr(ranking, "generate_recommendations", slow_llm)
+    monkeypatch.setattr(settings, "RANK_LLM_LATENCY_BUDGET", 0.05)
+    monkeypatch.setattr(ranking, "_llm_k", settings.RANK_LLM_MAX_K)
+    ranking._ranking_cache.clear()
+
+    async def run():
+        args = (["nature"], "couples", "medium", "winter", DESTINATIONS)
+        first = await ranking.rank_destinations(*args, deadline=0.01)
+        await asyncio.sleep(0.3)   # the late answer lands and shrinks K
+        second = await ranking.rank_destinations(*args, deadline=0.01)
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert all(d["ai_pending"] for d in first)
+    assert ranking.current_llm_k() < settings.RANK_LLM_MAX_K
+    assert len(calls) == 1
+    assert not any(d["ai_pending"] for d in second)
+    assert sum(d["ranked_by"] == "ai" for d in second) == settings.RANK_LLM_MAX_K
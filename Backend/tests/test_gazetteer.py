@@ -0,0 +1,31 @@
+import pytest
+
+from app.services import gazetteer
+
+CSV = """name,country,region,lat,lon,population,kind
+Paris,France,Île-de-France,48.8566,2.3522,2161000,city
+Hyderabad,India,Telangana,17.3850,78.4867,6731790,city
+Hyderabad,Pakistan,Sindh,25.3960,68.3578,1732693,city
+Jaipur,India,Rajasthan,26.9124,75.7873,3046163,city
+"""
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    csv_path = tmp_path / "gazetteer.csv"
+    csv_path.write_text(CSV, encoding="utf-8")
+    idx_path = tmp_path / "gazetteer.idx"
+    gazetteer.build_index(str(csv_path), str(idx_path))
+    monkeypatch.setattr(gazetteer, "_index", gazetteer.GazetteerIndex(str(idx_path)))
+
+
+def test_lookup_uses_context_to_disambiguate(index):
+    assert gazetteer.lookup("Hyderabad")["country"] == "India"
+    assert gazetteer.lookup("Hyderabad, Pakistan")["country"] == "Pakistan"
+    assert gazetteer.lookup("Jaipur, Rajasthan, India")["name"] == "Jaipur"
+
+
+def test_lookup_with_unmatched_context_falls_through(index):
+    assert gazetteer.lookup("Paris, Texas") is None
+    assert gazetteer.lookup("Jaipur, Pakistan") is None
+    assert gazetteer.lookup("Paris, France")["country"] == "France"
@@ -0,0 +1,20 @@
+import json
+
+from app.utils.json_stream import iter_array_items
+
+
+def test_number_split_across_chunks():
+    chunks = [b'{"elements": [12', b'345, 6', b'.5e', b'1, tr', b'ue]}']
+    assert list(iter_array_items(chunks, "elements")) == [12345, 65.0, True]
+
+
+def test_scalar_kept_until_delimiter_arrives():
+    chunks = [b'{"elements": [1, 2', b'3', b']}']
+    assert list(iter_array_items(chunks, "elements")) == [1, 23]
+
+
+def test_every_split_point():
+    doc = {"elements": [{"id": 1, "tags": {"name": "A"}}, 12345, -0.25, "x", None, [7, 8]]}
+    raw = json.dumps(doc).encode()
+    for i in range(1, len(raw)):
+        assert list(iter_array_items([raw[:i], raw[i:]], "elements")) == doc["elements"]
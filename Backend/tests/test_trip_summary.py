@@ -0,0 +1,55 @@
+import asyncio
+
+from app.services import trip_summary
+
+TRIP = {
+    "_id": "t1",
+    "source": "Delhi",
+    "destination": "Nowhere",
+    "days": 3,
+    "people": 2,
+    "budget": 20000,
+    "plan": {"itinerary": [], "estimated_cost": 15000, "confidence": 0.7},
+}
+
+
+def apply(update):
+    # what Mongo's $set on "summary.<a>.<b>" paths leaves in the trip
+    trip = dict(TRIP, summary={})
+    for path, value in update.items():
+        keys = path.split(".")
+        if keys[0] != "summary":
+            continue
+        node = trip["summary"]
+        for key in keys[1:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = value
+    return trip
+
+
+def test_empty_section_is_not_refetched_on_every_read(monkeypatch):
+    calls = []
+
+    async def transport(trip):
+        calls.append("transport")
+        return {"distance_km": 200, "options": [{"mode": "car", "estimated_cost": 4000}]}
+
+    async def hotels(trip):
+        calls.append("hotels")
+        return []
+
+    monkeypatch.setattr(trip_summary, "SECTION_FETCHERS", {"transport": transport, "hotels": hotels})
+
+    async def main():
+        summary, update = await trip_summary.get_trip_summary(dict(TRIP))
+        assert summary["sections"]["hotels"]["empty"] is True
+        # only section paths, never the whole summary document
+        assert "summary" not in update
+        assert {"summary.transport", "summary.hotels", "summary.sections.hotels"} <= set(update)
+
+        summary, update = await trip_summary.get_trip_summary(apply(update))
+        assert update == {}
+        assert summary["refreshing"] == []
+
+    asyncio.run(main())
+    assert calls == ["transport", "hotels"]
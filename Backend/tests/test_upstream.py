@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.core import upstream
+
+
+def run(handler, method="POST", **kwargs):
+    calls = []
+
+    async def main():
+        async def counted(request):
+            calls.append(request)
+            return await handler(request)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(counted))
+        upstream._clients["ors"] = (asyncio.get_running_loop(), client)
+        try:
+            return await upstream.request("ors", method, "https://ors.test/route", **kwargs)
+        finally:
+            await client.aclose()
+
+    try:
+        return asyncio.run(main()), calls
+    except Exception as e:
+        return e, calls
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "UPSTREAM_RETRIES", 2)
+    monkeypatch.setattr(settings, "UPSTREAM_BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(settings, "UPSTREAM_BACKOFF_MAX", 0.001)
+
+
+def test_connect_errors_and_503_are_retried():
+    async def refuse(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    result, calls = run(refuse)
+    assert isinstance(result, httpx.ConnectError) and len(calls) == 3
+
+    async def busy(request):
+        return httpx.Response(503)
+
+    result, calls = run(busy)
+    assert result.status_code == 503 and len(calls) == 3
+
+
+def test_read_timeouts_and_502_are_not_resent():
+    async def slow(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    result, calls = run(slow)
+    assert isinstance(result, httpx.ReadTimeout) and len(calls) == 1
+
+    async def bad_gateway(request):
+        return httpx.Response(502)
+
+    result, calls = run(bad_gateway)
+    assert result.status_code == 502 and len(calls) == 1
+
+
+def test_deadline_bounds_all_attempts():
+    async def hang(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200)
+
+    started = time.monotonic()
+    result, calls = run(hang, deadline=0.2)
+    assert isinstance(result, httpx.TimeoutException)
+    assert time.monotonic() - started < 1